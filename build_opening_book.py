@@ -0,0 +1,170 @@
+import argparse
+import logging
+import os
+import pickle
+import textwrap
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from isolation import Isolation, SymmetricSearchBoard
+from isolation.table import MappedTable, write_table
+from my_custom_player import CustomPlayer, MoveOrdering, TranspositionTable, HEURISTICS
+
+logger = logging.getLogger(__name__)
+
+NUM_PROCS = os.cpu_count() or 1
+NUM_PLIES = 4  # the book holds every position of the first plies of the game
+SEARCH_DEPTH = 5  # depth of the search of every book position
+BOOK_FILE = "data.pickle"
+TABLE_FILE = "data.bin"
+
+
+def book_key(state):
+    """ Return the key of the position in the opening book and the symmetry
+    that maps the position onto the frame the book moves are stored in
+
+    The key is the canonical Zobrist hash, so the four mirror images of a
+    position share one entry (see isolation.SymmetricSearchBoard).
+    """
+    return SymmetricSearchBoard.from_state(state).canonical_zobrist()
+
+
+def opening_positions(plies):
+    """ Return a list for each of the first `plies` plies of the game with one
+    position for every class of symmetric positions that can be reached at
+    that ply from the empty board
+    """
+    levels = [[Isolation()]]
+    for _ in range(plies - 1):
+        children = {}
+        for state in levels[-1]:
+            for action in state.actions():
+                child = state.result(action)
+                children.setdefault(book_key(child)[0], child)
+        levels.append(list(children.values()))
+    return levels
+
+
+_agent = None  # the searching agent of each worker process
+
+
+def search_position(state, depth, search_mode, heuristic):
+    """ Return the best move of an iterative deepening search of the position
+    to `depth` plies and its value for the player to move
+
+    Every search starts from empty tables, so the result does not depend on
+    the positions searched before it. The agent itself is created once per
+    process, since it loads the current book (data.pickle) when created.
+    """
+    global _agent
+    if _agent is None:
+        _agent = CustomPlayer(0)
+    agent = _agent
+    agent.player_id, agent.search_mode, agent.heuristic = state.player(), search_mode, heuristic
+    agent.tt, agent.ordering = TranspositionTable(), MoveOrdering()
+    for depth_limit in range(1, depth + 1):
+        move = agent.search(state, depth_limit)
+    return move, agent.tt.lookup(agent.new_board(state))[3]
+
+
+def build_book(plies=NUM_PLIES, depth=SEARCH_DEPTH, search_mode="alphabeta",
+               heuristic=CustomPlayer.heuristic, num_processes=NUM_PROCS):
+    """ Return the opening book {key: move} of the first `plies` plies
+
+    Every position from the first ply on is searched to a fixed depth, in
+    parallel. The empty board is not searched, since it has a move on every
+    cell of the board: the first move is the one whose reply has the worst
+    value for the second player. Moves are stored as plain ints in the frame
+    of the canonical variant of the position (see book_key).
+    """
+    levels = opening_positions(plies)
+    positions = [state for level in levels[1:] for state in level]
+    logger.info("Searching %d positions of plies 1 to %d", len(positions), plies - 1)
+    search = partial(search_position, depth=depth, search_mode=search_mode, heuristic=heuristic)
+    with ProcessPoolExecutor(max_workers=num_processes) as pool:
+        results = list(pool.map(search, positions, chunksize=max(len(positions) // (8 * num_processes), 1)))
+
+    book, values = {}, {}
+    for state, (move, value) in zip(positions, results):
+        key, sym = book_key(state)
+        book[key] = int(SymmetricSearchBoard.from_state(state).transform_action(move, sym))
+        values[key] = value
+    if plies > 1:
+        state = levels[0][0]
+        move = min(state.actions(), key=lambda action: values[book_key(state.result(action))[0]])
+        book[book_key(state)[0]] = int(move)
+    return book
+
+
+def main(args):
+    begin = time.perf_counter()
+    book = build_book(args.plies, args.depth, args.search_mode, args.heuristic, args.processes)
+    if args.table:
+        # the pickle only holds the path of the table, which the agents map into
+        # memory; it is stored relative to the pickle, since the agents load
+        # data.pickle from their working directory
+        write_table(args.table, book)
+        name = os.path.relpath(args.table, os.path.dirname(os.path.abspath(args.output)))
+        book = MappedTable(args.table, name=name)
+    with open(args.output, "wb") as f:
+        pickle.dump(book, f, protocol=pickle.HIGHEST_PROTOCOL)
+    message = "Wrote {} positions to {} in {:.1f} s".format(len(book), args.output, time.perf_counter() - begin)
+    logger.info(message)
+    print(message)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Build the opening book of CustomPlayer and CustomPlayer_MCTS.",
+        epilog=textwrap.dedent("""\
+            The book holds the best move, by a fixed depth search, of every position
+            of the first plies (with the mirror images of a position stored once).
+            The agents read it from data.pickle through self.data and play the book
+            move instead of searching whenever the position is in the book.
+
+            The book itself is written to a memory-mapped table file (data.bin) that
+            data.pickle refers to, so loading the agents does not read the whole book;
+            an empty --table writes the book into data.pickle as a dict instead.
+
+            Example Usage:
+            --------------
+            - Build a book of the first 4 plies searched to depth 6 with 4 processes:
+
+                $python build_opening_book.py -n 4 -d 6 -p 4
+        """)
+    )
+    parser.add_argument(
+        '-n', '--plies', type=int, default=NUM_PLIES,
+        help="Set the number of plies covered by the book."
+    )
+    parser.add_argument(
+        '-d', '--depth', type=int, default=SEARCH_DEPTH,
+        help="Set the search depth of every book position."
+    )
+    parser.add_argument(
+        '-s', '--search_mode', default="alphabeta", choices=("alphabeta", "pvs"),
+        help="Choose the search engine."
+    )
+    parser.add_argument(
+        '-H', '--heuristic', default=CustomPlayer.heuristic, choices=list(HEURISTICS),
+        help="Choose the leaf evaluation of the search."
+    )
+    parser.add_argument(
+        '-p', '--processes', type=int, default=NUM_PROCS,
+        help="Set the number of parallel processes used to search the positions."
+    )
+    parser.add_argument(
+        '-o', '--output', type=str, default=BOOK_FILE,
+        help="Write the book to this file (the agents read {}).".format(BOOK_FILE)
+    )
+    parser.add_argument(
+        '--table', type=str, default=TABLE_FILE,
+        help="Write the book to this table file (see isolation.table), referred to by the output file."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(filename="opening_book.log", filemode="w", level=logging.INFO)
+    main(args)
@@ -10,12 +10,15 @@ import time
 
 from collections import namedtuple
 from enum import Enum
-from multiprocessing import Process, Pipe
+from multiprocessing import Process, Pipe, RawValue
+from multiprocessing.connection import wait
 from queue import Empty
 
-from .isolation import Isolation, DebugState
+from .isolation import Action, Isolation, DebugState, SearchBoard, SymmetricSearchBoard
+from .instrument import Instruments, NULL_INSTRUMENTS
 
-__all__ = ['Isolation', 'DebugState', 'Status', 'play', 'fork_get_action']
+__all__ = ['Isolation', 'DebugState', 'SearchBoard', 'SymmetricSearchBoard', 'Instruments', 'Status', 'play',
+           'fork_get_action']
 logger = logging.getLogger(__name__)
 
 Agent = namedtuple("Agent", "agent_class name")
@@ -52,17 +55,30 @@ class Status(Enum):
 
 class StopSearch(Exception): pass  # Exception class used to halt search
 
+NO_ACTION = -1 << 63  # shared action value before the agent has put any action
+
 
 class TimedQueue:
     """Modified queue class to block .put() after a time limit expires,
     and to include both a context object & action choice in the queue.
+
+    An int action is stored in a shared memory value that the reading process
+    can see at once, so every put() is a single store however often the
+    agent reports its best move. The context of the agent (along with the
+    last item put if it was not an int) is pickled once, by finish(), when
+    get_action() returns, together with the Instruments of the move if the
+    agent is instrumented.
     """
-    def __init__(self, receiver, sender, time_limit):
+    def __init__(self, receiver, sender, time_limit, action=None):
         self.__sender = sender
         self.__receiver = receiver
         self.__time_limit = time_limit / 1000
         self.__stop_time = None
+        self.__action = RawValue("q", NO_ACTION) if action is None else action
+        self.__item = None
+        self.__message = None
         self.agent = None
+        self.stats = None  # the Instruments of the move, once the finish() message is read
 
     def start_timer(self):
         self.__stop_time = self.__time_limit + time.perf_counter()
@@ -70,28 +86,67 @@ class TimedQueue:
     def put(self, item, block=True, timeout=None):
         if self.__stop_time and time.perf_counter() > self.__stop_time:
             raise StopSearch
-        if self.__receiver.poll():
-            self.__receiver.recv()
-        self.__sender.send((getattr(self.agent, "context", None), item))
+        if isinstance(item, int):
+            self.__action.value = item
+            self.__item = None
+        else:
+            self.__item = item
 
     def put_nowait(self, item):
         self.put(item, block=False)
 
+    def finish(self):
+        """ Send the context, any item that is not an int and the Instruments
+        of an instrumented agent to the reader
+        """
+        stats = getattr(self.agent, "stats", NULL_INSTRUMENTS)
+        self.__sender.send((getattr(self.agent, "context", None), self.__item, stats if stats.enabled else None))
+
+    def wait(self, timeout=None, sentinel=None):
+        """ Wait up to `timeout` seconds for the finish() message, or until the
+        process with the given sentinel ends; return True if the message arrived
+
+        The message is read as soon as it arrives, so that a large context
+        cannot block the sending process on a full pipe.
+        """
+        if self.__message is None:
+            ready = wait([self.__receiver] + ([sentinel] if sentinel is not None else []), timeout)
+            if self.__receiver in ready or self.__receiver.poll():
+                try:
+                    self.__message = self.__receiver.recv()
+                except EOFError:  # the search process died
+                    pass
+        return self.__message is not None
+
     def get(self, block=True, timeout=None):
-        return self.__receiver.recv()
+        return self.get_nowait()
 
     def get_nowait(self):
-        return self.get(block=False)
-
-    def qsize(self): return int(self.__receiver.poll())
-    def empty(self): return ~self.__receiver.poll()
-    def full(self): return self.__receiver.poll()
+        """ Return (context, item) for the last item put; the context is the
+        current one of the agent if the search did not reach finish()
+
+        Raises Empty if no item was put.
+        """
+        context, item = getattr(self.agent, "context", None), None
+        if self.__receiver is not None:
+            self.wait(timeout=0)
+        if self.__message is not None:
+            context, item, self.stats = self.__message
+        if item is None:
+            if self.__action.value == NO_ACTION:
+                raise Empty
+            item = self.__action.value
+        return context, item
+
+    def qsize(self): return int(not self.empty())
+    def empty(self): return self.__action.value == NO_ACTION and self.__item is None
+    def full(self): return not self.empty()
 
 
 def play(args): return _play(*args)  # multithreading ThreadPool.map doesn't expand args
 
 
-def _play(agents, game_state, time_limit, match_id, debug=False):
+def _play(agents, game_state, time_limit, match_id, debug=False, persistent=False, instrument=False):
     """ Run a match between two agents by alternately soliciting them to
     select a move and applying it to advance the game state.
 
@@ -109,18 +164,35 @@ def _play(agents, game_state, time_limit, match_id, debug=False):
         The maximum number of milliseconds to allow before timeout during
         each turn (see notes)
 
+    persistent : bool
+        Run each agent in one worker process for the whole game (see
+        AgentWorker) instead of a new process for every move, so that
+        the agents keep their state between turns
+
+    instrument : bool
+        Collect the counters, timers and histograms the agents record on
+        their `stats` attribute (see isolation.instrument), along with the
+        number of moves and the time of every move of each agent
+
     Returns
     -------
     (agent, list<[(int, int),]>, Status)
         Return multiple including the winning agent, the actions that
         were applied to the initial state, a status code describing the
         reason the game ended, and any error information
+
+        If `instrument` is set, a fourth item holds the Instruments of
+        agents[0] and agents[1] for the game.
     """
     initial_state = game_state
     game_history = []
     winner = None
     status = Status.NORMAL
     players = [a.agent_class(player_id=i) for i, a in enumerate(agents)]
+    if instrument:
+        for player in players:
+            player.stats = Instruments()
+    workers = [AgentWorker(player) for player in players] if persistent and not debug else None
     logger.info(GAME_INFO.format(initial_state, *agents))
     while not game_state.terminal_test():
         active_idx = game_state.player()
@@ -129,7 +201,14 @@ def _play(agents, game_state, time_limit, match_id, debug=False):
         winner, loser = agents[1 - active_idx], agents[active_idx]
 
         try:
-            action = fork_get_action(game_state, players[active_idx], time_limit, debug)
+            move_start = time.perf_counter()
+            if workers:
+                action = workers[active_idx].get_action(game_state, time_limit)
+            else:
+                action = fork_get_action(game_state, players[active_idx], time_limit, debug)
+            if instrument:
+                players[active_idx].stats.count("moves")
+                players[active_idx].stats.add_time("move", time.perf_counter() - move_start)
         except Empty:
             status = Status.TIMEOUT
             logger.warn(textwrap.dedent("""\
@@ -157,13 +236,19 @@ def _play(agents, game_state, time_limit, match_id, debug=False):
         if game_state.utility(active_idx) > 0:
             winner, loser = loser, winner  # swap winner/loser if active player won
 
+    for worker in workers or ():
+        worker.stop()
+
     logger.info(RESULT_INFO.format(status, game_state, game_history, winner, loser))
+    if instrument:
+        return winner, game_history, match_id, tuple(player.stats for player in players)
     return winner, game_history, match_id
 
 
 def fork_get_action(game_state, active_player, time_limit, debug=False):
     receiver, sender = Pipe()
     action_queue = TimedQueue(receiver, sender, time_limit)
+    action_queue.agent = active_player
     if debug:  # run the search in the main process and thread
         from copy import deepcopy
         active_player.queue = None
@@ -175,11 +260,87 @@ def fork_get_action(game_state, active_player, time_limit, debug=False):
         try:
             p = Process(target=_request_action, args=(active_player, action_queue, game_state))
             p.start()
-            p.join(timeout=PROCESS_TIMEOUT + time_limit / 1000)
+            finished = action_queue.wait(timeout=PROCESS_TIMEOUT + time_limit / 1000, sentinel=p.sentinel)
+            p.join(timeout=PROCESS_TIMEOUT if finished else 0)
         finally:
             if p and p.is_alive(): p.terminate()
     new_context, action = action_queue.get_nowait()  # raises Empty if agent did not respond
     active_player.context = new_context
+    _merge_stats(active_player, action_queue.stats)
+    return _as_action(game_state, action)
+
+
+class AgentWorker:
+    """ Long-lived process that runs the get_action() calls of one agent
+    for a whole game, so that the agent keeps its state between turns
+
+    Each move is sent to the worker over a pipe, and the worker answers with
+    the TimedQueue.finish() message when get_action() returns; the actions
+    themselves are read from the shared value of the queue. As with
+    fork_get_action(), the search is stopped by the queue after the time
+    limit, and a worker that has not finished PROCESS_TIMEOUT seconds later is
+    terminated; a new worker is started for the next move of the agent.
+    """
+    def __init__(self, agent):
+        self.agent = agent
+        self.process = None
+
+    def start(self):
+        self.commands, worker_commands = Pipe()
+        self.action = RawValue("q", NO_ACTION)
+        self.process = Process(target=_agent_worker, args=(self.agent, worker_commands, self.action),
+                               daemon=True)
+        self.process.start()
+
+    def stop(self, wait=True):
+        """ Stop the worker, letting it finish its current move if `wait` is True """
+        if self.process is None:
+            return
+        if wait and self.process.is_alive():
+            try:
+                self.commands.send(None)
+            except OSError:
+                pass
+            self.process.join(timeout=PROCESS_TIMEOUT)
+        if self.process.is_alive(): self.process.terminate()
+        self.process = None
+
+    def get_action(self, game_state, time_limit):
+        if self.process is None or not self.process.is_alive():
+            self.stop()
+            self.start()
+        self.action.value = NO_ACTION
+        queue = TimedQueue(self.commands, None, time_limit, self.action)
+        queue.agent = self.agent
+        self.commands.send((game_state, time_limit))
+        if not queue.wait(timeout=PROCESS_TIMEOUT + time_limit / 1000, sentinel=self.process.sentinel):
+            self.stop(wait=False)
+        new_context, action = queue.get_nowait()  # raises Empty if agent did not respond
+        self.agent.context = new_context
+        _merge_stats(self.agent, queue.stats)
+        return _as_action(game_state, action)
+
+
+def _agent_worker(agent, commands, action):
+    """ Serve the get_action() requests of an AgentWorker until it sends None """
+    while True:
+        request = commands.recv()
+        if request is None:
+            break
+        game_state, time_limit = request
+        _request_action(agent, TimedQueue(None, commands, time_limit, action), game_state)
+
+
+def _merge_stats(agent, stats):
+    """ Add the Instruments of a move sent back by the search process to the agent's """
+    if stats is not None:
+        agent.stats.merge(stats)
+
+
+def _as_action(game_state, action):
+    """ Restore the Action type of an action read back as a plain int """
+    if game_state.locs[game_state.player()] is not None and action in Action._value2member_map_:
+        return Action(action)
     return action
 
 
@@ -189,8 +350,12 @@ def _request_action(agent, queue, game_state):
     """
     agent.queue = queue
     queue.agent = agent
+    if getattr(agent, "stats", NULL_INSTRUMENTS).enabled:
+        agent.stats = Instruments()  # record this move alone; the caller merges the moves
     try:
         queue.start_timer()
         agent.get_action(game_state)
     except StopSearch:
         pass
+    finally:
+        queue.finish()
@@ -0,0 +1,157 @@
+"""
+Exact endgame solving once the players are partitioned
+
+When no open cell can be reached by both knights, the players cannot block
+each other any more, and each of them can only try to stay in the game as long
+as possible inside their own region. If the player to move can make at most
+Lp more moves and their opponent at most Lo, the player to move loses if and
+only if Lp <= Lo (they run out of moves first, or at the same time, which
+leaves them stuck on their turn).
+
+The functions run on the bitboard integer and the player locations, like
+those of isolation.rollout, and find the regions with the flood fill of
+Isolation.flood_fill().
+"""
+from .isolation import _WIDTH, _SIZE, _BLANK_BOARD, _MOVES, _NEIGHBOR_MASKS, _flood_fill, _popcount
+
+DEFAULT_BUDGET = 20000  # longest path search nodes per solve() call
+
+# Knight moves always change the colour of the square (the parity of x + y), so
+# a path alternates between the cells of the other colour and of the colour of
+# its start. _COLORS[c] masks the cells of colour c and _CELL_COLORS holds the
+# colour of every cell.
+_CELL_COLORS = tuple((cell % (_WIDTH + 2) + cell // (_WIDTH + 2)) % 2 for cell in range(_SIZE))
+_COLORS = tuple(sum(1 << cell for cell in range(_SIZE) if _CELL_COLORS[cell] == color) & _BLANK_BOARD
+                for color in range(2))
+
+
+class BudgetExceeded(Exception): pass  # Exception class used to abandon a search that takes too long
+
+
+def partition(board, locs):
+    """ Return the regions (reachable masks, see Isolation.flood_fill) of
+    player 0 and player 1 if they are disjoint, otherwise None (also before
+    both players are placed)
+
+    The regions are connected components of the open cells, so they are
+    disjoint unless the region of player 0 holds an open target of player 1;
+    in the middle game the region of player 1 is never filled.
+    """
+    if None in locs:
+        return None
+    region = _flood_fill(board, locs[0])[0]
+    if region & _NEIGHBOR_MASKS[locs[1]]:
+        return None
+    return region, _flood_fill(board, locs[1])[0]
+
+
+class EndgameSolver:
+    """ Longest knight's path search with a memo shared between calls
+
+    The memo maps (open cells of the region, location) to the length of the
+    longest path, so the many positions of a search tree that leave a region
+    in the same state are solved once. Each call of solve() or longest_path()
+    may visit at most `budget` positions that are not in the memo; past that
+    the position is left unsolved (None) and the caller falls back on its
+    heuristics. The memo is cleared when it grows past `max_entries`.
+
+    A search tree keeps reaching regions that differ by a cell or two, which
+    are as hard as each other, so the solver also remembers the smallest
+    region (in open cells) that ran out of each budget and gives up at once
+    on regions at least that large.
+    """
+    def __init__(self, budget=DEFAULT_BUDGET, max_entries=1 << 18):
+        self.budget = budget
+        self.max_entries = max_entries
+        self.memo = {}
+        self.too_large = {}  # open cells of the smallest region that ran out of each budget
+        self.nodes = 0  # positions searched by the last call
+        self._budget = budget
+
+    def longest_path(self, board, loc, region=None, budget=None):
+        """ Return the number of moves of the longest knight's path from `loc`
+        over the open cells of `region` (the region reachable from `loc` if
+        None), or None if the search visits more than `budget` positions
+        (self.budget if None), or if a region at least as large did
+        """
+        if region is None:
+            region = _flood_fill(board, loc)[0]
+        if len(self.memo) > self.max_entries:
+            self.memo.clear()
+        self.nodes = 0
+        self._budget = budget = self.budget if budget is None else budget
+        board &= region
+        cells = _popcount(board)
+        if cells >= self.too_large.get(budget, _SIZE) and (board, loc) not in self.memo:
+            return None
+        try:
+            return self._longest_path(board, loc)
+        except BudgetExceeded:
+            self.too_large[budget] = cells
+            return None
+
+    def _longest_path(self, board, loc):
+        key = (board, loc)
+        length = self.memo.get(key)
+        if length is not None:
+            return length
+        self.nodes += 1
+        if self.nodes > self._budget:
+            raise BudgetExceeded
+        # the moves land alternately on the other colour and on the colour of
+        # loc, so the path cannot outlast the open cells of either colour
+        color = _CELL_COLORS[loc]
+        bound = min(2 * _popcount(board & _COLORS[1 - color]), 2 * _popcount(board & _COLORS[color]) + 1)
+        length = 0
+        for _, cell, bit in _MOVES[loc]:
+            if board & bit:
+                length = max(length, 1 + self._longest_path(board ^ bit, cell))
+                if length == bound:
+                    break
+        self.memo[key] = length
+        return length
+
+    def path_lengths(self, board, locs, budget=None):
+        """ Return the longest path lengths (L0, L1) of the players if they are
+        partitioned and both are solved within the budget, otherwise None
+        """
+        regions = partition(board, locs)
+        if regions is None:
+            return None
+        lengths = []
+        for loc, region in zip(locs, regions):
+            length = self.longest_path(board, loc, region, budget)
+            if length is None:
+                return None
+            lengths.append(length)
+        return tuple(lengths)
+
+    def solve(self, board, locs, player, budget=None):
+        """ Return the index of the winner under perfect play if the players
+        are partitioned and the position is solved within the budget,
+        otherwise None
+
+        `player` is the index of the player to move.
+        """
+        lengths = self.path_lengths(board, locs, budget)
+        if lengths is None:
+            return None
+        return 1 - player if lengths[player] <= lengths[1 - player] else player
+
+    def best_move(self, board, locs, player, budget=None):
+        """ Return (action, winner) for the player to move if the position is
+        solved (see solve()) and they have a move, otherwise None
+
+        The action starts a longest path of the player, which is the best
+        move whether they win or lose: it keeps them in the game longest.
+        """
+        lengths = self.path_lengths(board, locs, budget)
+        if lengths is None:
+            return None
+        loc = locs[player]
+        region = _flood_fill(board, loc)[0]
+        winner = 1 - player if lengths[player] <= lengths[1 - player] else player
+        for action, cell, bit in _MOVES[loc]:
+            if board & bit and self.longest_path(board ^ bit, cell, region ^ bit, budget) == lengths[player] - 1:
+                return action, winner
+        return None
@@ -0,0 +1,94 @@
+"""
+Search instrumentation: counters, timers and histograms collected by agents
+
+An agent records what its search does on its `stats` attribute, e.g.,
+
+    self.stats.count("nodes", self.nodes)
+    self.stats.observe("depth", depth)
+    with self.stats.timer("search"):
+        ...
+
+By default `stats` is NULL_INSTRUMENTS, whose methods do nothing, so the calls
+cost close to nothing when the game is not instrumented. _play(instrument=True)
+gives each agent an Instruments object instead; the agent then records every
+move on a fresh Instruments that is sent back along with its context when the
+move ends, and the harness merges the moves of each agent into one Instruments
+per game.
+"""
+import time
+
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+
+
+class Instruments:
+    """ Named counters, timers (in seconds) and histograms of values """
+    enabled = True
+
+    def __init__(self):
+        self.counters = Counter()
+        self.timers = defaultdict(float)
+        self.histograms = defaultdict(Counter)
+
+    def count(self, name, n=1):
+        """ Add `n` to the counter `name` """
+        self.counters[name] += n
+
+    def add_time(self, name, seconds):
+        """ Add `seconds` to the timer `name` """
+        self.timers[name] += seconds
+
+    @contextmanager
+    def timer(self, name):
+        """ Add the time spent in the with block to the timer `name`, even if
+        the block is left by an exception (such as StopSearch)
+        """
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] += time.perf_counter() - begin
+
+    def observe(self, name, value):
+        """ Add one occurrence of `value` to the histogram `name` """
+        self.histograms[name][value] += 1
+
+    def merge(self, other):
+        """ Add the counts, times and histograms of `other` to this object and return it """
+        self.counters.update(other.counters)
+        for name, seconds in other.timers.items():
+            self.timers[name] += seconds
+        for name, histogram in other.histograms.items():
+            self.histograms[name].update(histogram)
+        return self
+
+    def __repr__(self):
+        return "Instruments(counters={}, timers={}, histograms={})".format(
+            dict(self.counters), dict(self.timers), {k: dict(v) for k, v in self.histograms.items()})
+
+
+class NullInstruments:
+    """ Instruments that record nothing (see NULL_INSTRUMENTS) """
+    enabled = False
+
+    def count(self, name, n=1): pass
+    def add_time(self, name, seconds): pass
+    def timer(self, name): return _NULL_TIMER
+    def observe(self, name, value): pass
+
+
+NULL_INSTRUMENTS = NullInstruments()
+_NULL_TIMER = nullcontext()
+
+
+def summarize(histogram):
+    """ Return (min, mean, median, mode, max) of the values counted in a histogram
+
+    >>> summarize(Counter({3: 2, 4: 1, 8: 1}))
+    (3, 4.5, 3.5, 3, 8)
+    """
+    values = sorted(histogram.elements())
+    middle = len(values) // 2
+    median = values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+    mode = histogram.most_common(1)[0][0]
+    return values[0], sum(values) / len(values), median, mode, values[-1]
@@ -3,6 +3,8 @@
 #                          DO NOT MODIFY THIS FILE                            #
 ###############################################################################
 from enum import IntEnum
+from functools import lru_cache
+from random import Random
 from typing import NamedTuple
 
 
@@ -33,6 +35,144 @@ class Action(IntEnum):
 
 _ACTIONSET = set(Action)  # used for efficient membership testing
 
+# Precompute the knight-move neighborhood of every cell once at import. Each
+# entry of _MOVES lists (action, target cell, target bit) in Action order for
+# the targets that fall on the board, and _NEIGHBOR_MASKS ORs the target bits
+# together so that a single AND with the board tells whether any are open.
+# Targets that would wrap around an edge land on the zero border bits of
+# _BLANK_BOARD and are dropped here, so no bounds checks remain at search time.
+_MOVES = tuple(
+    tuple((a, loc + a, 1 << (loc + a)) for a in Action
+          if loc + a >= 0 and _BLANK_BOARD & (1 << (loc + a)))
+    for loc in range(_SIZE)
+)
+_NEIGHBOR_MASKS = tuple(sum(bit for _, _, bit in moves) for moves in _MOVES)
+
+# Zobrist keys for hashing search positions: one key per blocked cell, one key
+# per (player, location) pair, and one key that is toggled with the side to
+# move. A fixed seed keeps the hashes identical in every process.
+_zobrist_rng = Random(0x15014710)
+_ZOBRIST_CELLS = tuple(_zobrist_rng.getrandbits(64) for _ in range(_SIZE))
+_ZOBRIST_LOCS = tuple(tuple(_zobrist_rng.getrandbits(64) for _ in range(_SIZE)) for _ in range(2))
+_ZOBRIST_SIDE = _zobrist_rng.getrandbits(64)
+# combined key for a player entering (and blocking) a cell on their move
+_ZOBRIST_MOVES = tuple(tuple(_ZOBRIST_CELLS[c] ^ _ZOBRIST_LOCS[p][c] ^ _ZOBRIST_SIDE for c in range(_SIZE))
+                       for p in range(2))
+
+
+def _zobrist_hash(board, ply_count, locs):
+    """ Return the Zobrist hash of the position from scratch (see SearchBoard) """
+    key = _ZOBRIST_SIDE if ply_count % 2 else 0
+    for cell in _bit_indices(_BLANK_BOARD & ~board):
+        key ^= _ZOBRIST_CELLS[cell]
+    for player_id, loc in enumerate(locs):
+        if loc is not None:
+            key ^= _ZOBRIST_LOCS[player_id][loc]
+    return key
+
+
+# int.bit_count() is only available from python 3.10
+_popcount = getattr(int, "bit_count", None) or (lambda mask: bin(mask).count("1"))
+
+
+def _bit_indices(mask):
+    """ Return the indices of the set bits in `mask` in increasing order """
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(low.bit_length() - 1)
+        mask ^= low
+    return cells
+
+
+# Knight moves on a whole set of cells at once: the positive Action offsets
+# shift the set left and the negative ones right. Moves that would wrap around
+# an edge land on the padding bits, which are never set in a board, so ANDing
+# with the board keeps exactly the open targets.
+_LEFT_SHIFTS = tuple(a for a in Action if a > 0)
+_RIGHT_SHIFTS = tuple(-a for a in Action if a < 0)
+
+
+@lru_cache(maxsize=4096)
+def _flood_fill(board, loc):
+    """ Return (region, layers) for a knight on `loc` (see Isolation.flood_fill) """
+    if loc is None:
+        return board, (board,) if board else ()
+    frontier, region, layers = 1 << loc, 0, []
+    open_cells = board
+    while True:
+        targets = 0
+        for shift in _LEFT_SHIFTS:
+            targets |= frontier << shift
+        for shift in _RIGHT_SHIFTS:
+            targets |= frontier >> shift
+        frontier = targets & open_cells
+        if not frontier:
+            return region, tuple(layers)
+        layers.append(frontier)
+        region |= frontier
+        open_cells ^= frontier
+
+
+# The board has four symmetries; each is its own inverse:
+#   0 = identity, 1 = mirror left-right, 2 = mirror top-bottom, 3 = rotate 180 degrees
+def _mirror_cell(cell, sym):
+    x, y = cell % (_WIDTH + 2), cell // (_WIDTH + 2)
+    if x >= _WIDTH: return None  # border bit
+    if sym & 1: x = _WIDTH - 1 - x
+    if sym & 2: y = _HEIGHT - 1 - y
+    return y * (_WIDTH + 2) + x
+
+_SYMMETRIC_CELLS = tuple(tuple(_mirror_cell(c, sym) for c in range(_SIZE)) for sym in range(4))
+_CENTER = (_HEIGHT // 2) * (_WIDTH + 2) + _WIDTH // 2
+_SYMMETRIC_ACTIONS = tuple(
+    {a: Action(_SYMMETRIC_CELLS[sym][_CENTER + a] - _SYMMETRIC_CELLS[sym][_CENTER]) for a in Action}
+    for sym in range(4)
+)
+
+# Rotating the board 180 degrees maps cell i to cell _SIZE - 1 - i, so it just
+# reverses the bitstring: reverse the bits of every byte with a lookup table,
+# reverse the byte order, and drop the padding bits of the last byte.
+_REVERSED_BYTES = bytes(int("{:08b}".format(i)[::-1], 2) for i in range(256))
+_BOARD_BYTES = (_SIZE + 7) // 8
+_ROW_MASK = (1 << (_WIDTH + 2)) - 1
+
+
+def _rotate_board(board):
+    """ Return the bitboard rotated by 180 degrees """
+    reversed_bytes = board.to_bytes(_BOARD_BYTES, "big").translate(_REVERSED_BYTES)
+    return int.from_bytes(reversed_bytes, "little") >> (8 * _BOARD_BYTES - _SIZE)
+
+
+def _flip_board(board):
+    """ Return the bitboard mirrored top-bottom (the row order reversed) """
+    flipped = 0
+    for _ in range(_HEIGHT):
+        flipped = (flipped << (_WIDTH + 2)) | (board & _ROW_MASK)
+        board >>= _WIDTH + 2
+    return flipped
+
+
+def _transform_board(board, sym):
+    if sym & 1:
+        board = _rotate_board(board)
+        sym ^= 3  # a left-right mirror is a rotation followed by a top-bottom mirror
+    return _flip_board(board) if sym & 2 else board
+
+
+# Zobrist keys of the mirrored positions, for the symmetries 1-3: hashing a cell
+# with the key of its mirror image gives the hash of the mirrored position.
+_SYMMETRIC_ZOBRIST_MOVES = tuple(
+    tuple(tuple(_ZOBRIST_MOVES[p][_SYMMETRIC_CELLS[sym][c]] if _BLANK_BOARD >> c & 1 else 0 for sym in (1, 2, 3))
+          for c in range(_SIZE))
+    for p in range(2)
+)
+_SYMMETRIC_ZOBRIST_LOCS = tuple(
+    tuple(tuple(_ZOBRIST_LOCS[p][_SYMMETRIC_CELLS[sym][c]] if _BLANK_BOARD >> c & 1 else 0 for sym in (1, 2, 3))
+          for c in range(_SIZE))
+    for p in range(2)
+)
+
 
 class Isolation(NamedTuple('Isolation', [('board', int), ('ply_count', int), ('locs', int)])):
     """ Bitboard implementation of knight's Isolation game state
@@ -74,7 +214,10 @@ class Isolation(NamedTuple('Isolation', [('board', int), ('ply_count', int), ('l
         loc = self.locs[self.player()]
         if loc is None:
             return self.liberties(loc)
-        return [a for a in Action if (a + loc) >= 0 and (self.board & (1 << (a + loc)))]
+        board = self.board
+        if not board & _NEIGHBOR_MASKS[loc]:
+            return []
+        return [a for a, _, bit in _MOVES[loc] if board & bit]
 
     def player(self):
         """ Return the id (zero for first player, one for second player) of player
@@ -120,7 +263,7 @@ class Isolation(NamedTuple('Isolation', [('board', int), ('ply_count', int), ('l
         bool
             True if either player has no legal moves, otherwise False
         """
-        return not (self._has_liberties(0) and self._has_liberties(1))
+        return self.outcome() is not None
 
     def utility(self, player_id):
         """ Returns the utility of the current game state from the perspective
@@ -144,11 +287,32 @@ class Isolation(NamedTuple('Isolation', [('board', int), ('ply_count', int), ('l
             a value of -inf if the player has lost, and a value of 0
             otherwise.
         """
-        if not self.terminal_test(): return 0
-        player_id_is_active = (player_id == self.player())
-        active_has_liberties = self._has_liberties(self.player())
-        active_player_wins = (active_has_liberties == player_id_is_active)
-        return float("inf") if active_player_wins else float("-inf")
+        winner = self.outcome()
+        if winner is None: return 0
+        return float("inf") if winner == player_id else float("-inf")
+
+    def outcome(self):
+        """ Return the id of the winning player if the game is over, otherwise None
+
+        This fuses terminal_test() and utility() into a single check of at most
+        two neighborhood masks: the active player loses if they have no open
+        liberties, and otherwise wins if their opponent has none.
+
+        Returns
+        -------
+        int or None
+            The 0-indexed id number of the winner, or None if both players
+            still have legal moves
+        """
+        active = self.ply_count % 2
+        board = self.board
+        loc = self.locs[active]
+        if not (board if loc is None else board & _NEIGHBOR_MASKS[loc]):
+            return 1 - active
+        loc = self.locs[1 - active]
+        if not (board if loc is None else board & _NEIGHBOR_MASKS[loc]):
+            return active
+        return None
 
     def liberties(self, loc):
         """ Return a list of "liberties"--open cells in the neighborhood of `loc`
@@ -165,8 +329,102 @@ class Isolation(NamedTuple('Isolation', [('board', int), ('ply_count', int), ('l
             A list containing the position of open liberties in the
             neighborhood of the starting position
         """
-        cells = range(_SIZE) if loc is None else (loc + a for a in Action)
-        return [c for c in cells if c >= 0 and self.board & (1 << c)]
+        board = self.board
+        if loc is None:
+            return _bit_indices(board)
+        if not board & _NEIGHBOR_MASKS[loc]:
+            return []
+        return [c for _, c, bit in _MOVES[loc] if board & bit]
+
+    def transform(self, sym):
+        """ Return the state mirrored by the board symmetry `sym`
+
+        Parameters
+        ----------
+        sym : int
+            0 = identity, 1 = mirror left-right, 2 = mirror top-bottom,
+            3 = rotate 180 degrees (each symmetry is its own inverse)
+        """
+        cells = _SYMMETRIC_CELLS[sym]
+        locs = tuple(None if loc is None else cells[loc] for loc in self.locs)
+        return Isolation(board=_transform_board(self.board, sym), ply_count=self.ply_count, locs=locs)
+
+    def transform_action(self, action, sym):
+        """ Return the action in self.transform(sym) that corresponds to `action` in this state
+
+        Since every symmetry is its own inverse, the same call maps an action of
+        the transformed state back to this state.
+        """
+        if self.locs[self.player()] is None:
+            return _SYMMETRIC_CELLS[sym][action]
+        return _SYMMETRIC_ACTIONS[sym][action]
+
+    def canonical(self):
+        """ Return the canonical representative of the four symmetric variants
+        of this state along with the symmetry that maps this state onto it
+
+        Symmetric states share the same representative, so it can be used as
+        the key of tables that pool results across symmetric positions. An
+        action `a` of the representative maps back with transform_action(a, sym).
+
+        Returns
+        -------
+        (Isolation, int)
+        """
+        def order(variant):
+            state, _ = variant
+            return (state.board,) + tuple(-1 if loc is None else loc for loc in state.locs)
+        return min(((self.transform(sym), sym) for sym in range(4)), key=order)
+
+    def liberty_mask(self, loc):
+        """ Return a bitboard with the bits of the open cells in the neighborhood
+        of `loc` set (every open cell on the board if `loc` is None)
+
+        See Also
+        -------
+            Isolation.liberties()
+        """
+        if loc is None:
+            return self.board
+        return self.board & _NEIGHBOR_MASKS[loc]
+
+    def flood_fill(self, loc):
+        """ Return the open cells a knight on `loc` can reach by any sequence
+        of moves over open cells, along with their distances
+
+        The fill expands a whole layer at a time with one shift per knight
+        direction. The results of recent calls are cached by (board, loc), so
+        evaluation functions can call it at every leaf of a search.
+
+        Parameters
+        ----------
+        loc : int or None
+            The anchor point of the fill; if None (a player that has not been
+            placed yet), every open cell is reachable in one move
+
+        Returns
+        -------
+        (int, tuple<int>)
+            The bitboard of the reachable region, and the bitboards of its
+            layers: layers[i] holds the cells first reached after i + 1 moves
+        """
+        return _flood_fill(self.board, loc)
+
+    def mobility(self, player_id):
+        """ Return the number of liberties of the specified player without
+        building the list of liberties
+
+        Parameters
+        ----------
+        player_id : int
+            The 0-indexed id number of the player
+
+        Returns
+        -------
+        int
+            Equal to len(self.liberties(self.locs[player_id]))
+        """
+        return _popcount(self.liberty_mask(self.locs[player_id]))
 
     def _has_liberties(self, player_id):
         """ Return True if the player has any legal moves in the given state
@@ -175,7 +433,148 @@ class Isolation(NamedTuple('Isolation', [('board', int), ('ply_count', int), ('l
         -------
             Isolation.liberties()
         """
-        return any(self.liberties(self.locs[player_id]))
+        return bool(self.liberty_mask(self.locs[player_id]))
+
+
+class SearchBoard:
+    """ Mutable companion to Isolation for walking the game tree in place
+
+    Search code can push() an action, evaluate the child position and pop()
+    it again instead of allocating a new Isolation for every edge. The board
+    uses the same bitboard layout as Isolation and shares its read-only
+    methods, so heuristics written against Isolation accept either one.
+
+    Attributes
+    ----------
+    board: int
+        Bitboard of open cells (see Isolation.board)
+
+    ply_count: int
+        Cumulative count of the number of actions applied to the board
+
+    locs: list
+        Mutable pair of player locations (see Isolation.locs)
+
+    zobrist: int
+        64-bit Zobrist hash of (board, locs, side to move), updated
+        incrementally by push() and pop() for transposition tables
+
+    Examples
+    --------
+    >>> board = SearchBoard.from_state(Isolation().result(57).result(0))
+    >>> board.push(board.actions()[0])
+    >>> board.ply_count
+    3
+    >>> board.pop()
+    >>> board.to_state() == Isolation().result(57).result(0)
+    True
+    """
+    __slots__ = ("board", "ply_count", "locs", "zobrist", "_history")
+
+    def __init__(self, board=_BLANK_BOARD, ply_count=0, locs=(None, None)):
+        self.board = board
+        self.ply_count = ply_count
+        self.locs = list(locs)
+        self.zobrist = _zobrist_hash(board, ply_count, locs)
+        self._history = []
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state.board, state.ply_count, state.locs)
+
+    def to_state(self):
+        """ Return an immutable Isolation copy of the current position """
+        return Isolation(board=self.board, ply_count=self.ply_count, locs=tuple(self.locs))
+
+    def push(self, action):
+        """ Apply the action for the active player in place
+
+        Unlike Isolation.result(), the action is not validated; it must come
+        from actions() in the current position.
+        """
+        player = self.ply_count % 2
+        loc = self.locs[player]
+        self._history.append(loc)
+        if loc is None:
+            loc = action
+        else:
+            self.zobrist ^= _ZOBRIST_LOCS[player][loc]
+            loc += action
+        self.board ^= 1 << loc
+        self.zobrist ^= _ZOBRIST_MOVES[player][loc]
+        self.locs[player] = loc
+        self.ply_count += 1
+
+    def pop(self):
+        """ Undo the most recent push() """
+        self.ply_count -= 1
+        player = self.ply_count % 2
+        loc = self.locs[player]
+        self.board ^= 1 << loc
+        self.zobrist ^= _ZOBRIST_MOVES[player][loc]
+        loc = self.locs[player] = self._history.pop()
+        if loc is not None:
+            self.zobrist ^= _ZOBRIST_LOCS[player][loc]
+
+    # the read-only methods only touch board, ply_count & locs, so they are shared
+    actions = Isolation.actions
+    transform_action = Isolation.transform_action
+    player = Isolation.player
+    terminal_test = Isolation.terminal_test
+    utility = Isolation.utility
+    outcome = Isolation.outcome
+    liberties = Isolation.liberties
+    liberty_mask = Isolation.liberty_mask
+    flood_fill = Isolation.flood_fill
+    mobility = Isolation.mobility
+    _has_liberties = Isolation._has_liberties
+
+
+class SymmetricSearchBoard(SearchBoard):
+    """ SearchBoard that also tracks the Zobrist hashes of its three mirror
+    images so that tables can pool the four symmetric variants of a position
+
+    Examples
+    --------
+    >>> state = Isolation().result(57).result(0)
+    >>> board = SymmetricSearchBoard.from_state(state)
+    >>> mirror = SymmetricSearchBoard.from_state(state.transform(1))
+    >>> board.canonical_zobrist()[0] == mirror.canonical_zobrist()[0]
+    True
+    """
+    __slots__ = ("symmetric_zobrist", "_symmetric_history")
+
+    def __init__(self, board=_BLANK_BOARD, ply_count=0, locs=(None, None)):
+        super().__init__(board, ply_count, locs)
+        state = Isolation(board, ply_count, tuple(locs))
+        self.symmetric_zobrist = tuple(_zobrist_hash(*state.transform(sym)) for sym in (1, 2, 3))
+        self._symmetric_history = []
+
+    def push(self, action):
+        player = self.ply_count % 2
+        loc = self.locs[player]
+        super().push(action)
+        h1, h2, h3 = self.symmetric_zobrist
+        self._symmetric_history.append(self.symmetric_zobrist)
+        if loc is not None:
+            k1, k2, k3 = _SYMMETRIC_ZOBRIST_LOCS[player][loc]
+            h1, h2, h3 = h1 ^ k1, h2 ^ k2, h3 ^ k3
+        k1, k2, k3 = _SYMMETRIC_ZOBRIST_MOVES[player][self.locs[player]]
+        self.symmetric_zobrist = (h1 ^ k1, h2 ^ k2, h3 ^ k3)
+
+    def pop(self):
+        super().pop()
+        self.symmetric_zobrist = self._symmetric_history.pop()
+
+    def canonical_zobrist(self):
+        """ Return the smallest of the four symmetric hashes and the symmetry
+        (see Isolation.transform) that maps the position onto the variant it hashes
+        """
+        key, sym = self.zobrist, 0
+        for mirror, mirror_key in enumerate(self.symmetric_zobrist, 1):
+            if mirror_key < key:
+                key, sym = mirror_key, mirror
+        return key, sym
 
 
 class DebugState(Isolation):
@@ -0,0 +1,136 @@
+"""
+Fast random playouts for Monte Carlo search
+
+The playouts run directly on the bitboard integer and the two player locations
+with the precomputed knight-move tables of the isolation module, so no game
+state objects are created along the way; only the winner is returned.
+
+batch_playout() runs many playouts of the same position in lockstep with numpy,
+which is optional: the rest of the module works without it.
+"""
+import random
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .isolation import _SIZE, _MOVES, _NEIGHBOR_MASKS, _bit_indices, _popcount
+
+
+def playout(board, locs, player, bias=0.0, rng=random):
+    """ Play random moves from the position until one player is isolated
+
+    The rules match Isolation.outcome(): the player to move loses when they
+    have no open neighbor, and wins when their opponent has none.
+
+    Parameters
+    ----------
+    board : int
+        Bitboard of the open cells (Isolation.board)
+
+    locs : (int or None, int or None)
+        Locations of player 0 and player 1 (None before their first move)
+
+    player : int
+        Index of the player to move
+
+    bias : float
+        Probability of choosing a move by a one-ply mobility heuristic (the
+        target with the most open neighbors) instead of uniformly at random
+
+    rng : random.Random
+        Source of randomness, e.g., a seeded Random for reproducible playouts
+
+    Returns
+    -------
+    int
+        Index of the winning player
+    """
+    choice, uniform = rng.choice, rng.random
+    loc, opponent_loc = locs[player], locs[1 - player]
+    while True:
+        if loc is None:
+            targets = _bit_indices(board)
+        else:
+            targets = [cell for _, cell, bit in _MOVES[loc] if board & bit]
+        if not targets:
+            return 1 - player
+        if opponent_loc is not None and not board & _NEIGHBOR_MASKS[opponent_loc]:
+            return player
+        if bias and uniform() < bias:
+            loc = max(targets, key=lambda cell: _popcount(board & _NEIGHBOR_MASKS[cell]))
+        else:
+            loc = choice(targets)
+        board ^= 1 << loc
+        loc, opponent_loc = opponent_loc, loc
+        player = 1 - player
+
+
+def batch_playout(board, locs, player, playouts, rng=None):
+    """ Run `playouts` random playouts from the position in lockstep and return
+    the fraction won by `player`, the player to move
+
+    The boards are held as a (playouts, cells) boolean array of open cells and
+    each step moves the active player in every unfinished game at once. Each
+    cell has its eight knight targets in a table, where the targets that fall
+    off the board point at an extra cell that is never open. Positions where a
+    player has not been placed yet are played out one at a time with playout().
+
+    Parameters
+    ----------
+    board, locs, player :
+        The position, as for playout()
+
+    playouts : int
+        Number of playouts to run
+
+    rng : numpy.random.Generator
+        Source of randomness (a fresh default_rng() if None)
+
+    Returns
+    -------
+    float
+    """
+    if np is None:
+        raise ImportError("batch_playout() requires numpy")
+    if None in locs:
+        return sum(playout(board, locs, player) == player for _ in range(playouts)) / playouts
+    if rng is None:
+        rng = np.random.default_rng()
+
+    games = np.arange(playouts)
+    cells = np.zeros(_SIZE + 1, dtype=bool)
+    cells[_bit_indices(board)] = True
+    is_open = np.tile(cells, (playouts, 1))
+    game_locs = [np.full(playouts, loc) for loc in locs]
+    winners = np.full(playouts, -1)
+    alive = np.ones(playouts, dtype=bool)
+    active = player
+    while True:
+        loc, opponent_loc = game_locs[active], game_locs[1 - active]
+        targets = _TARGETS[loc]
+        movable = is_open[games[:, None], targets]
+        counts = movable.sum(axis=1)
+        lost = alive & (counts == 0)
+        won = alive & ~lost & ~is_open[games[:, None], _TARGETS[opponent_loc]].any(axis=1)
+        winners[lost] = 1 - active
+        winners[won] = active
+        alive &= ~(lost | won)
+        if not alive.any():
+            return float(np.mean(winners == player))
+        # pick the k-th open target of each game, with k uniform in [0, counts)
+        picks = (rng.random(playouts) * counts).astype(int)
+        choices = (movable.cumsum(axis=1) > picks[:, None]).argmax(axis=1)
+        moving = games[alive]
+        new_locs = targets[moving, choices[alive]]
+        is_open[moving, new_locs] = False
+        loc[moving] = new_locs
+        active = 1 - active
+
+
+if np is not None:
+    # the eight knight targets of every cell, padded with the never-open cell _SIZE
+    _TARGETS = np.full((_SIZE + 1, 8), _SIZE)
+    for _loc, _moves in enumerate(_MOVES):
+        _TARGETS[_loc, :len(_moves)] = [cell for _, cell, _ in _moves]
@@ -0,0 +1,110 @@
+"""
+Memory-mapped lookup tables keyed by position hashes
+
+A table file holds a header followed by fixed-size (key, value) records sorted
+by key, where the key is an unsigned 64 bit hash (such as the canonical Zobrist
+hash of a SymmetricSearchBoard) and the value a signed 32 bit int (such as a
+move). MappedTable maps the file into memory instead of reading it, so opening
+a table takes the same time whatever its size, every process that opens the
+file shares its pages, and a lookup is a binary search that touches only the
+few pages it reads.
+
+A MappedTable pickles as the path of its file, so a small pickle can stand in
+for a large table wherever a pickled object is expected (e.g., data.pickle,
+which sample_players.DataPlayer loads into self.data). A relative path is
+resolved against the working directory when the table is unpickled, which for
+data.pickle is the directory of the pickle itself. A table file that is missing
+or not valid unpickles as None (no table), like a missing data.pickle.
+"""
+import logging
+import mmap
+import os
+import struct
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"ISOTBL01"
+_HEADER = struct.Struct("<8sQ")  # magic, number of records
+_RECORD = struct.Struct("<Qi")  # key, value
+
+
+def write_table(path, items):
+    """ Write the (key, value) pairs of a mapping or an iterable to a table file
+
+    The table is written to a temporary file that then replaces `path`, so
+    the processes that have the previous table mapped keep reading it intact.
+    """
+    records = sorted(dict(items).items())
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(records)))
+            f.write(b"".join(_RECORD.pack(key, value) for key, value in records))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _load_table(path):
+    """ Return the MappedTable of the file, or None if it cannot be read """
+    try:
+        return MappedTable(path)
+    except (OSError, ValueError) as e:
+        logger.warning("Table %s not loaded: %s", path, e)
+        return None
+
+
+class MappedTable:
+    """ Read-only mapping from the keys to the values of a table file
+
+    Supports get(), [], `in` and len() like a dict. The table pickles as
+    `name`, the path of the file by default (see the module docstring).
+    Raises ValueError if the file is not a complete table file.
+    """
+    def __init__(self, path, name=None):
+        self.path = path
+        self.name = path if name is None else name
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)  # ValueError if empty
+        if len(self._map) < _HEADER.size:
+            self._map.close()
+            raise ValueError("{} is not a table file".format(path))
+        magic, self._size = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC or len(self._map) != _HEADER.size + self._size * _RECORD.size:
+            self._map.close()
+            raise ValueError("{} is not a table file".format(path))
+
+    def get(self, key, default=None):
+        """ Return the value of `key` if it is in the table, otherwise `default` """
+        data, unpack, record_size, offset = self._map, _RECORD.unpack_from, _RECORD.size, _HEADER.size
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            middle_key, value = unpack(data, offset + middle * record_size)
+            if middle_key < key:
+                low = middle + 1
+            elif middle_key > key:
+                high = middle
+            else:
+                return value
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return self._size
+
+    def close(self):
+        self._map.close()
+
+    def __reduce__(self):
+        return _load_table, (self.name,)
@@ -1,11 +1,287 @@
-import copy
-import datetime
+import logging
 import math
+import os
 import random
+import time
+import weakref
 
-from isolation.isolation import _WIDTH, _HEIGHT
+from array import array
+from functools import partial
+from multiprocessing import Pipe, Process
+
+from isolation.endgame import EndgameSolver
+from isolation.instrument import NULL_INSTRUMENTS
+from isolation.isolation import _WIDTH, _HEIGHT, _SIZE, _popcount, SearchBoard, SymmetricSearchBoard
+from isolation.rollout import np, playout, batch_playout
 from sample_players import DataPlayer
 
+logger = logging.getLogger(__name__)
+
+
+# Heuristics: the score of a game state from the perspective of player_id #
+def player_mobility(gameState, player_id):
+    return (gameState.mobility(player_id), gameState.mobility(1 - player_id))
+
+
+def baseline(gameState, player_id):
+    mob_player, mob_opp = player_mobility(gameState, player_id)
+    return mob_player - mob_opp
+
+
+def avoid_borders(gameState, player_id):
+    # Get the distance to the closest border
+    loc_player = gameState.locs[player_id]
+    player = (loc_player % (_WIDTH + 2), loc_player // (_WIDTH + 2))
+    min_x, min_y = min(player[0], _WIDTH - 1 - player[0]), min(player[1], _HEIGHT - 1 - player[1])
+    penalty = 0
+    if min_x + min_y == 0:
+        penalty = -10
+    elif min_x + min_y == 1:
+        penalty = -5
+    return penalty
+
+
+def baseline_avoid_borders(gameState, player_id):
+    return baseline(gameState, player_id) + avoid_borders(gameState, player_id)
+
+
+def offensive(gameState, player_id, weight):
+    mob_player, mob_opp = player_mobility(gameState, player_id)
+    return mob_player - weight*mob_opp
+
+
+def defensive(gameState, player_id, weight):
+    mob_player, mob_opp = player_mobility(gameState, player_id)
+    return weight*mob_player - mob_opp
+
+
+def offensive_to_defensive(gameState, player_id, weight):
+    board_fields_occcupied = gameState.ply_count / (_WIDTH * _HEIGHT)
+    if board_fields_occcupied <= 0.50:
+        return offensive(gameState, player_id, weight)
+    else:
+        return defensive(gameState, player_id, weight)
+
+
+def defensive_to_offensive(gameState, player_id, weight):
+    board_fields_occcupied = gameState.ply_count / (_WIDTH * _HEIGHT)
+    if board_fields_occcupied <= 0.50:
+        return defensive(gameState, player_id, weight)
+    else:
+        return offensive(gameState, player_id, weight)
+
+
+def aggresive_attack_then_aggresive_defend(gameState, player_id, weight):
+    mob_player, mob_opp = player_mobility(gameState, player_id)
+    board_fields_occcupied = gameState.ply_count / (_WIDTH * _HEIGHT)
+    if board_fields_occcupied <= 0.3: # about 1/2 way through a typical game
+        return mob_player - weight*mob_opp*(1 - board_fields_occcupied)
+    else:
+        return weight*mob_player*(1 - board_fields_occcupied) - mob_opp
+
+
+def voronoi(gameState, player_id):
+    # Territory: the open cells player_id reaches in fewer knight moves than
+    # the opponent, minus those the opponent reaches first (ties count for
+    # nobody). The distance layers of both players come from the cached flood
+    # fill and are walked side by side, nearest first.
+    own = gameState.flood_fill(gameState.locs[player_id])[1]
+    opp = gameState.flood_fill(gameState.locs[1 - player_id])[1]
+    claimed = score = 0
+    for distance in range(max(len(own), len(opp))):
+        own_cells = own[distance] & ~claimed if distance < len(own) else 0
+        opp_cells = opp[distance] & ~claimed if distance < len(opp) else 0
+        score += _popcount(own_cells & ~opp_cells) - _popcount(opp_cells & ~own_cells)
+        claimed |= own_cells | opp_cells
+    return score
+
+
+# Heuristics selectable with CustomPlayer.heuristic
+HEURISTICS = {
+    "baseline": baseline,
+    "baseline_avoid_borders": baseline_avoid_borders,
+    "offensive": partial(offensive, weight=2),
+    "defensive": partial(defensive, weight=2),
+    "offensive_to_defensive": partial(offensive_to_defensive, weight=3),
+    "defensive_to_offensive": partial(defensive_to_offensive, weight=3),
+    "aggresive_attack_then_aggresive_defend": partial(aggresive_attack_then_aggresive_defend, weight=3),
+    "voronoi": voronoi,
+}
+
+
+def book_move(book, state):
+    """ Return the move of the opening book for the state, or None if the
+    position is not in the book
+
+    The book (see build_opening_book.py), a dict or an isolation.table.MappedTable,
+    maps the canonical Zobrist hash of a position to its move in the frame of
+    the canonical variant, which is mapped back to the frame of the state here.
+    """
+    if not book:
+        return None
+    board = SymmetricSearchBoard.from_state(state)
+    key, sym = board.canonical_zobrist()
+    move = book.get(key)
+    return None if move is None else board.transform_action(move, sym)
+
+
+class TranspositionTable:
+    """ Fixed-size table of alpha-beta search results keyed by the Zobrist hash
+    of the position (see isolation.SearchBoard)
+
+    Each slot holds one (key, depth, flag, value, move, generation) tuple, where
+    flag tells whether value is EXACT or only a LOWER or UPPER bound of the true
+    minimax value. A slot is overwritten by results from the same position, from
+    a search at least as deep, or when its entry is left over from an earlier
+    call to new_search(); otherwise the deeper (more expensive) result is kept.
+
+    With `symmetric` set the table is keyed by the canonical hash of the
+    position instead (the boards must be isolation.SymmetricSearchBoard), so the
+    four mirror images of a position share one entry. Moves are stored in the
+    frame of the canonical variant and mapped back to the frame of the board
+    on the way out.
+    """
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    def __init__(self, size_bits=16, symmetric=False):
+        self.mask = (1 << size_bits) - 1
+        self.entries = [None] * (1 << size_bits)
+        self.generation = 0
+        self.symmetric = symmetric
+
+    def new_search(self):
+        """ Mark all current entries as replaceable by the next search """
+        self.generation += 1
+
+    def lookup(self, board):
+        if self.symmetric:
+            key, sym = board.canonical_zobrist()
+        else:
+            key, sym = board.zobrist, 0
+        entry = self.entries[key & self.mask]
+        if entry is None or entry[0] != key:
+            return None
+        if sym and entry[4] is not None:
+            entry = entry[:4] + (board.transform_action(entry[4], sym), entry[5])
+        return entry
+
+    def store(self, board, depth, flag, value, move):
+        if self.symmetric:
+            key, sym = board.canonical_zobrist()
+            if sym and move is not None:
+                move = board.transform_action(move, sym)
+        else:
+            key = board.zobrist
+        index = key & self.mask
+        entry = self.entries[index]
+        if entry is None or entry[0] == key or depth >= entry[1] or entry[5] != self.generation:
+            self.entries[index] = (key, depth, flag, value, move, self.generation)
+
+    def probe(self, board, alpha, beta, depth):
+        """ Narrow the (alpha, beta) window with the entry of the position. The
+        stored value is returned in place of a search when the entry was searched
+        at least `depth` plies deep and decides the node.
+
+        Returns
+        -------
+        (value or None, alpha, beta, best move or None)
+        """
+        entry = self.lookup(board)
+        if entry is None:
+            return None, alpha, beta, None
+        _, entry_depth, flag, value, move, _ = entry
+        if entry_depth >= depth:
+            if flag == self.EXACT:
+                return value, alpha, beta, move
+            if flag == self.LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value, alpha, beta, move
+        return None, alpha, beta, move
+
+    @classmethod
+    def bound(cls, value, alpha, beta):
+        """ Return the flag for a value searched with the window (alpha, beta) """
+        if value <= alpha:
+            return cls.UPPER
+        if value >= beta:
+            return cls.LOWER
+        return cls.EXACT
+
+
+class MoveOrdering:
+    """ Order the moves of alpha-beta nodes to produce cutoffs as early as possible
+
+    Moves are tried in the order: the principal variation move (the best move
+    of the previous iteration, taken from the transposition table), the two
+    killer moves that last caused a cutoff at the same ply, then the remaining
+    moves by their history score. History scores are kept per player and target
+    cell and grow by depth^2 for each cutoff. Killers and history survive
+    between the iterations of the iterative deepening.
+
+    `pv_moves` maps the Zobrist hash of a position to a move predicted for it
+    (such as the principal variation of the previous turn), which is tried
+    first when the transposition table has no move for the position.
+
+    The cutoff counters measure the ordering quality: `first_move_cutoff_rate`
+    is the fraction of cutoffs produced by the first move tried. Setting
+    `enabled` to False keeps the counters but searches moves in Action order,
+    as a baseline for comparison.
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.killers = [[None, None] for _ in range(_SIZE + 1)]  # indexed by ply_count
+        self.history = [[0] * _SIZE for _ in range(2)]  # indexed by player & target cell
+        self.pv_moves = {}
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    @property
+    def cutoff_rate(self):
+        return self.cutoffs / max(self.nodes, 1)
+
+    @property
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / max(self.cutoffs, 1)
+
+    def order(self, gameState, pv_move=None):
+        """ Return the legal actions of gameState in search order """
+        self.nodes += 1
+        actions = gameState.actions()
+        if not self.enabled or len(actions) < 2:
+            return actions
+        if pv_move is None and self.pv_moves:
+            pv_move = self.pv_moves.get(gameState.zobrist)
+        player = gameState.ply_count % 2
+        loc, history = gameState.locs[player], self.history[player]
+        if loc is not None:  # placements are not ordered by history
+            actions.sort(key=lambda a: history[loc + a], reverse=True)
+        killers = self.killers[gameState.ply_count]
+        for move in (killers[1], killers[0], pv_move):
+            if move is not None and move in actions:
+                actions.remove(move)
+                actions.insert(0, move)
+        return actions
+
+    def cutoff(self, gameState, move, index, depth):
+        """ Record that `move`, tried at position `index` of the ordered moves,
+        caused a cutoff in a node searched to `depth` remaining plies
+        """
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        if not self.enabled:
+            return
+        killers = self.killers[gameState.ply_count]
+        if killers[0] != move:
+            killers[1], killers[0] = killers[0], move
+        player = gameState.ply_count % 2
+        if gameState.locs[player] is not None:
+            self.history[player][gameState.locs[player] + move] += depth * depth
+
 
 # This is Alpha Beta Search #
 #class CustomPlayer_Alfa_Beta(DataPlayer):
@@ -18,6 +294,42 @@ class CustomPlayer(DataPlayer):
     default interface.
     """
 
+    search_mode = "alphabeta"  # or "pvs" (see pvs_search)
+    heuristic = "aggresive_attack_then_aggresive_defend"  # leaf evaluation, a key of HEURISTICS
+    aspiration_window = 2.0  # half width of the pvs root window around the previous score
+    symmetry = False  # share transposition table entries between mirrored positions
+    stats = NULL_INSTRUMENTS  # set by the harness to collect search statistics (see isolation.instrument)
+    # partitioned positions are solved exactly (see isolation.endgame): at the
+    # root with up to endgame_budget path search nodes, and at the search nodes
+    # with at least endgame_depth plies left with up to endgame_search_budget
+    endgame_budget = 20000
+    endgame_depth = 2
+    endgame_search_budget = 500
+
+    def __init__(self, player_id):
+        super().__init__(player_id)
+        # shared by every depth of the iterative deepening
+        self.tt = TranspositionTable(symmetric=self.symmetry)
+        self.ordering = MoveOrdering()
+        self.endgame = EndgameSolver(self.endgame_budget)
+        self.nodes = 0  # number of nodes visited by the search
+
+    def new_board(self, state):
+        """ Return the board to search `state` in place with push()/pop() """
+        if self.symmetry:
+            return SymmetricSearchBoard.from_state(state)
+        return SearchBoard.from_state(state)
+
+    def score(self, gameState):
+        """ Heuristic value of a non-terminal state from the perspective of this player """
+        return HEURISTICS[self.heuristic](gameState, self.player_id)
+
+    def search(self, gameState, depth_limit, report=None):
+        """ Run the search engine selected by `search_mode` to a fixed depth """
+        if self.search_mode == "pvs":
+            return self.pvs_search(gameState, depth_limit, report)
+        return self.alpha_beta_search(gameState, depth_limit, report)
+
     def get_action(self, state):
         """ Employ an adversarial search technique to choose an action
         available in the current state calls self.queue.put(ACTION) at least
@@ -29,21 +341,90 @@ class CustomPlayer(DataPlayer):
         See RandomPlayer and GreedyPlayer in sample_players for more examples.
 
         """
+        move = book_move(self.data, state)
+        if move is not None:
+            self.stats.count("book")
+            self.queue.put(move)
+            return
         if state.ply_count < 2:
             self.queue.put(random.choice(state.actions()))
-        else:
-            depth_limit = 9
-            try:
+            return
+        actions = state.actions()
+        if not actions:
+            return
+        # answer at once, since an endgame that is not solved within the budget takes a while
+        self.queue.put(actions[0])
+        # once the players are partitioned, follow the longest path of this player
+        solved = self.endgame.best_move(state.board, state.locs, state.player())
+        if solved is not None:
+            self.stats.count("endgame")
+            self.context = None
+            self.queue.put(solved[0])
+            return
+        depth_limit = 9
+        self.tt.new_search()
+        self.nodes = 0
+        # then with the move predicted by the previous turn's search, if any
+        seeded_move = self.load_context(state)
+        if seeded_move in actions:
+            self.queue.put(seeded_move)
+        # the queue raises StopSearch once the time is up, which ends the search
+        completed = 0
+        try:
+            with self.stats.timer("search"):
                 for depth in range(1, depth_limit + 1):
-                    self.queue.put(self.alpha_beta_search(state, depth))
-            except Exception:  # At deeper levels (depth) we will experience time out exception - ignore
-                pass
+                    self.search(state, depth, report=self.queue.put)
+                    self.save_context(state, depth)
+                    completed = depth
+                    logger.debug("depth %d: cutoff rate %.3f, first move cutoff rate %.3f", depth,
+                                 self.ordering.cutoff_rate, self.ordering.first_move_cutoff_rate)
+        finally:
+            self.stats.count("nodes", self.nodes)
+            self.stats.observe("depth", completed)
 
-    def alpha_beta_search(self, gameState, depth_limit):
+    def load_context(self, state):
+        """ Seed move ordering from the context saved on the previous turn and
+        return the move it predicted for `state` (or None)
+
+        The context holds the history scores and the principal variation of
+        the last completed search as the root state and its moves. The PV moves
+        only seed the move ordering (see MoveOrdering.pv_moves), so they never
+        replace the entries of the transposition table.
+        """
+        self.ordering.pv_moves = {}
+        if not self.context:
+            return None
+        self.ordering.history = [[score >> 1 for score in scores] for scores in self.context["history"]]
+        gameState = self.new_board(self.context["root"])
+        for move in self.context["pv"]:
+            self.ordering.pv_moves[gameState.zobrist] = move
+            gameState.push(move)
+        return self.ordering.pv_moves.get(self.new_board(state).zobrist)
+
+    def save_context(self, state, depth):
+        """ Store the history scores and the principal variation found by the
+        search in self.context so that the next turn can start from them
+        """
+        gameState = self.new_board(state)
+        pv = []
+        for _ in range(depth):
+            entry = self.tt.lookup(gameState)
+            if entry is None or entry[4] not in gameState.actions():
+                break
+            pv.append(entry[4])
+            gameState.push(entry[4])
+        self.context = {"history": self.ordering.history, "root": state, "pv": pv}
+
+    def alpha_beta_search(self, gameState, depth_limit, report=None):
         """ Return the move along a branch of the game tree that
         has the best possible value. A move is a pair of coordinates
         in (column, row) order corresponding to a legal move for
         the searching player.
+
+        If `report` is given it is called with the best move found so far
+        after each root move has been searched. The best move of the previous
+        depth is searched first, so every reported move is at least as well
+        informed as the result of the previous depth.
         """
 
         def min_value(gameState, alpha, beta, depth_limit):
@@ -51,25 +432,34 @@ class CustomPlayer(DataPlayer):
             player. The game has a utility of +inf if the player has won, a value of
             -inf if the player has lost, and a value of 0 otherwise.
             """
-
-            if gameState.terminal_test():
-                return gameState.utility(self.player_id)
+            self.nodes += 1
+            winner = gameState.outcome()
+            if winner is None and depth_limit >= endgame_depth:
+                winner = endgame.solve(gameState.board, gameState.locs, gameState.player(), endgame_budget)
+            if winner is not None:
+                return float("inf") if winner == self.player_id else float("-inf")
 
             if depth_limit <= 0:
-                #return baseline(gameState)
-                #return baseline_avoid_borders(gameState)
-                #return offensive_to_defensive(gameState, 3)
-                #return offensive(gameState, 2)
-                #return defensive(gameState, 2)
-                #return defensive_to_offensive(gameState, 3)
-                return aggresive_attack_then_aggresive_defend(gameState, 3)
+                return self.score(gameState)
 
+            value, alpha, beta, tt_move = tt.probe(gameState, alpha, beta, depth_limit)
+            if value is not None:
+                return value
+
+            beta_orig = beta
             v = float("inf")
-            for a in gameState.actions():
-                v = min(v, max_value(gameState.result(a), alpha, beta, depth_limit - 1))
+            best_move = None
+            for i, a in enumerate(ordering.order(gameState, tt_move)):
+                gameState.push(a)
+                score = max_value(gameState, alpha, beta, depth_limit - 1)
+                gameState.pop()
+                if best_move is None or score < v:
+                    v, best_move = score, a
                 if v <= alpha:
-                    return v
+                    ordering.cutoff(gameState, a, i, depth_limit)
+                    break
                 beta = min(beta, v)
+            tt.store(gameState, depth_limit, tt.bound(v, alpha, beta_orig), v, best_move)
             return v
 
         def max_value(gameState, alpha, beta, depth_limit):
@@ -77,97 +467,280 @@ class CustomPlayer(DataPlayer):
             player. The game has a utility of +inf if the player has won, a value of
             -inf if the player has lost, and a value of 0 otherwise.
             """
-            if gameState.terminal_test():
-                return gameState.utility(self.player_id)
+            self.nodes += 1
+            winner = gameState.outcome()
+            if winner is None and depth_limit >= endgame_depth:
+                winner = endgame.solve(gameState.board, gameState.locs, gameState.player(), endgame_budget)
+            if winner is not None:
+                return float("inf") if winner == self.player_id else float("-inf")
 
             if depth_limit <= 0:
-                #return baseline(gameState)
-                #return baseline_avoid_borders(gameState)
-                #return offensive_to_defensive(gameState, 3)
-                #return offensive(gameState, 2)
-                #return defensive(gameState, 2)
-                #return defensive_to_offensive(gameState, 3)
-                return aggresive_attack_then_aggresive_defend(gameState, 3)
+                return self.score(gameState)
 
+            value, alpha, beta, tt_move = tt.probe(gameState, alpha, beta, depth_limit)
+            if value is not None:
+                return value
+
+            alpha_orig = alpha
             v = float("-inf")
-            for a in gameState.actions():
-                v = max(v, min_value(gameState.result(a), alpha, beta, depth_limit - 1))
+            best_move = None
+            for i, a in enumerate(ordering.order(gameState, tt_move)):
+                gameState.push(a)
+                score = min_value(gameState, alpha, beta, depth_limit - 1)
+                gameState.pop()
+                if best_move is None or score > v:
+                    v, best_move = score, a
                 if v >= beta:
-                    return v
+                    ordering.cutoff(gameState, a, i, depth_limit)
+                    break
                 alpha = max(alpha, v)
+            tt.store(gameState, depth_limit, tt.bound(v, alpha_orig, beta), v, best_move)
             return v
 
-        def player_liberties(gameState):
-            loc_player = gameState.locs[self.player_id]
-            loc_opp = gameState.locs[1 - self.player_id]
-            return (gameState.liberties(loc_player), gameState.liberties(loc_opp))
-
-        def baseline(gameState):
-            lib_player, lib_opp = player_liberties(gameState)
-            return len(lib_player) - len(lib_opp)
-
-        def avoid_borders(gameState):
-            # Get the distance to the closest border
-            loc_player = gameState.locs[self.player_id]
-            player = (loc_player % (_WIDTH + 2), loc_player // (_WIDTH + 2))
-            min_x, min_y = min(player[0], _WIDTH - 1 - player[0]), min(player[1], _HEIGHT - 1 - player[1])
-            penalty = 0
-            if min_x + min_y == 0:
-                penalty = -10
-            elif min_x + min_y == 1:
-                penalty = -5
-            return penalty
-
-        def baseline_avoid_borders(gameState):
-            return baseline(gameState) + avoid_borders(gameState)
-
-        def offensive(gameState, weight):
-            lib_player, lib_opp = player_liberties(gameState)
-            return len(lib_player) - weight*len(lib_opp)
-
-        def defensive(gameState, weight):
-            lib_player, lib_opp = player_liberties(gameState)
-            return weight*len(lib_player) - len(lib_opp)
-
-        def offensive_to_defensive(gameState, weight):
-            board_fields_occcupied = gameState.ply_count / (_WIDTH * _HEIGHT)
-            if board_fields_occcupied <= 0.50:
-                return offensive(gameState, weight)
-            else:
-                return defensive(gameState, weight)
-
-        def defensive_to_offensive(gameState, weight):
-            board_fields_occcupied = gameState.ply_count / (_WIDTH * _HEIGHT)
-            if board_fields_occcupied <= 0.50:
-                return defensive(gameState, weight)
-            else:
-                return offensive(gameState, weight)
-
-        def aggresive_attack_then_aggresive_defend(gameState, weight):
-            lib_player, lib_opp = player_liberties(gameState)
-            board_fields_occcupied = gameState.ply_count / (_WIDTH * _HEIGHT)
-            if board_fields_occcupied <= 0.3: # about 1/2 way through a typical game
-                return len(lib_player) - weight*len(lib_opp)*(1 - board_fields_occcupied)
-            else:
-                return weight*len(lib_player)*(1 - board_fields_occcupied) - len(lib_opp)
-
-
         ### alpha_beta_search ###
+        gameState = self.new_board(gameState)  # searched in place with push()/pop()
+        tt, ordering = self.tt, self.ordering
+        endgame, endgame_depth, endgame_budget = self.endgame, self.endgame_depth, self.endgame_search_budget
+        self.nodes += 1
         alpha = float("-inf")
         beta = float("inf")
         best_score = float("-inf")
         # Important initialise best_move: makes testing the solution stable by avoiding returning None in a losing game
-        best_move = gameState.actions()[0]
-        for a in gameState.actions():
-            v = min_value(gameState.result(a), alpha, beta, depth_limit - 1)
+        _, _, _, tt_move = tt.probe(gameState, alpha, beta, depth_limit)
+        actions = ordering.order(gameState, tt_move)
+        best_move = actions[0]
+        for a in actions:
+            gameState.push(a)
+            v = min_value(gameState, alpha, beta, depth_limit - 1)
+            gameState.pop()
             alpha = max(alpha, v)
             if v > best_score:
                 best_score = v
                 best_move = a
+            if report is not None:
+                report(best_move)
+        tt.store(gameState, depth_limit, TranspositionTable.EXACT, best_score, best_move)
+        return best_move
+
+    def pvs_search(self, gameState, depth_limit, report=None):
+        """ Return the best move found by a negamax principal variation search
+        (NegaScout) with an aspiration window at the root
+
+        The first move of every node is searched with the full window and the
+        others with a zero window that only tests whether they beat the best
+        move so far; a move that does is searched again with the full window.
+        (Until some move has a finite score there is no window to test against.)
+        The root window is centred on the score of the previous depth (from
+        the transposition table) and widened when the result falls outside.
+
+        Values are from the perspective of the player to move, so the table
+        entries are not interchangeable with those of alpha_beta_search.
+        `report` is called as in alpha_beta_search.
+        """
+        # width of the zero window; the heuristics return non-integer values
+        epsilon = 1e-6
+
+        def pvs(gameState, alpha, beta, depth_limit):
+            self.nodes += 1
+            winner = gameState.outcome()
+            if winner is None and depth_limit >= endgame_depth:
+                winner = endgame.solve(gameState.board, gameState.locs, gameState.player(), endgame_budget)
+            if winner is not None:
+                return float("inf") if winner == gameState.player() else float("-inf")
+
+            if depth_limit <= 0:
+                score = self.score(gameState)
+                return score if gameState.player() == self.player_id else -score
+
+            value, alpha, beta, tt_move = tt.probe(gameState, alpha, beta, depth_limit)
+            if value is not None:
+                return value
+
+            alpha_orig = alpha
+            v = float("-inf")
+            best_move = None
+            for i, a in enumerate(ordering.order(gameState, tt_move)):
+                gameState.push(a)
+                if i == 0 or alpha == float("-inf"):
+                    score = -pvs(gameState, -beta, -alpha, depth_limit - 1)
+                else:
+                    score = -pvs(gameState, -alpha - epsilon, -alpha, depth_limit - 1)
+                    if alpha < score < beta:
+                        score = -pvs(gameState, -beta, -alpha, depth_limit - 1)
+                gameState.pop()
+                if best_move is None or score > v:
+                    v, best_move = score, a
+                if v >= beta:
+                    ordering.cutoff(gameState, a, i, depth_limit)
+                    break
+                alpha = max(alpha, v)
+            tt.store(gameState, depth_limit, tt.bound(v, alpha_orig, beta), v, best_move)
+            return v
+
+        def pvs_root(gameState, alpha, beta, depth_limit, tt_move):
+            self.nodes += 1
+            best_score, best_move = float("-inf"), None
+            for i, a in enumerate(ordering.order(gameState, tt_move)):
+                gameState.push(a)
+                if i == 0 or alpha == float("-inf"):
+                    score = -pvs(gameState, -beta, -alpha, depth_limit - 1)
+                else:
+                    score = -pvs(gameState, -alpha - epsilon, -alpha, depth_limit - 1)
+                    if alpha < score < beta:
+                        score = -pvs(gameState, -beta, -alpha, depth_limit - 1)
+                gameState.pop()
+                if best_move is None or score > best_score:
+                    best_score, best_move = score, a
+                # only a move that beats the window is known to be better than the first one
+                if report is not None and (i == 0 or score > alpha):
+                    report(best_move)
+                if score >= beta:
+                    break
+                alpha = max(alpha, score)
+            return best_score, best_move
+
+        ### pvs_search ###
+        gameState = self.new_board(gameState)  # searched in place with push()/pop()
+        tt, ordering = self.tt, self.ordering
+        endgame, endgame_depth, endgame_budget = self.endgame, self.endgame_depth, self.endgame_search_budget
+        alpha, beta = float("-inf"), float("inf")
+        entry = tt.lookup(gameState)
+        tt_move = None if entry is None else entry[4]
+        if entry is not None and abs(entry[3]) != float("inf"):
+            alpha, beta = entry[3] - self.aspiration_window, entry[3] + self.aspiration_window
+        while True:
+            score, best_move = pvs_root(gameState, alpha, beta, depth_limit, tt_move)
+            if score <= alpha and alpha != float("-inf"):
+                alpha = float("-inf")  # fail low: the previous best move got worse
+            elif score >= beta and beta != float("inf"):
+                tt_move, beta = best_move, float("inf")  # fail high: search the new best move first
+            else:
+                break
+        tt.store(gameState, depth_limit, TranspositionTable.EXACT, score, best_move)
         return best_move
 
 
 # This is Monte Carlo Tree Search #
+class MCTSNode:
+    """ Node of the Monte Carlo search tree
+
+    `plays` and `wins` count the playouts through the node and the ones won by
+    the player who moved into it. `actions` and `children` are filled in when
+    the node is expanded; the actions are stored in the frame of the canonical
+    variant of the position (see CustomPlayer_MCTS.key). `log_plays` caches
+    log(plays) for the UCB1 selection among the children.
+    """
+    __slots__ = ("key", "actions", "children", "plays", "wins", "log_plays")
+
+    def __init__(self, key):
+        self.key = key
+        self.actions = None
+        self.children = None
+        self.plays = 0
+        self.wins = 0
+        self.log_plays = 0.0
+
+
+def _mcts_worker(connection, settings):
+    """ Serve the requests of an MCTSWorkerPool until it sends None
+
+    The worker keeps its own CustomPlayer_MCTS, whose tree lives on between
+    the requests of a game. Each reply carries the id of its request.
+    """
+    random.seed()  # the forked workers must not share the random sequence
+    agent = CustomPlayer_MCTS(0, pool=False)  # daemon processes cannot start workers of their own
+    for name, value in settings.items():
+        setattr(agent, name, value)
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        request_id, command, args = request
+        if command == "search":
+            state, milli_sec = args
+            agent.monte_carlo_tree_search(state, milli_sec)
+            result = agent.root_statistics(state)
+        else:  # "playouts"
+            board, locs, player, playouts = args
+            if playouts > 1 and np is not None:
+                result = playouts * batch_playout(board, locs, player, playouts)
+            else:
+                result = sum(playout(board, locs, player, agent.rollout_bias) == player for _ in range(playouts))
+        connection.send((request_id, result))
+
+
+class MCTSWorkerPool:
+    """ Worker processes for parallel Monte Carlo tree search
+
+    The workers are started once, when the agent is created at the start of a
+    game, and serve every move of the game; they are stopped when the pool is
+    garbage collected. Requests go out to all workers at once and carry an id,
+    so that the replies to a request abandoned by an earlier move (whose search
+    process was terminated) are recognized and dropped.
+
+    Requests
+    --------
+    search(state, milli_sec): every worker searches the state in its own tree
+        (root parallelization); collect() returns their root statistics
+    playouts(board, locs, player, playouts, timeout): every worker runs the
+        playouts of a leaf (leaf parallelization); the number of replies that
+        arrive within `timeout` seconds and their total wins of `player` are
+        returned
+    """
+    def __init__(self, workers, settings):
+        self.connections, self.processes = [], []
+        for _ in range(workers):
+            connection, worker_connection = Pipe()
+            process = Process(target=_mcts_worker, args=(worker_connection, settings), daemon=True)
+            process.start()
+            self.connections.append(connection)
+            self.processes.append(process)
+        self.requests = 0
+        weakref.finalize(self, MCTSWorkerPool._shutdown, self.connections, self.processes, os.getpid())
+
+    @staticmethod
+    def _shutdown(connections, processes, pid):
+        if os.getpid() != pid:
+            return  # a forked copy of the pool does not own the workers
+        for connection in connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+        for process in processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+
+    def send(self, command, *args):
+        """ Send a request to every worker and return its id """
+        self.requests += 1
+        request_id = (os.getpid(), self.requests)
+        for connection in self.connections:
+            connection.send((request_id, command, args))
+        return request_id
+
+    def collect(self, request_id, timeout):
+        """ Return the replies to the request that arrive within `timeout` seconds """
+        deadline = time.perf_counter() + timeout
+        results = []
+        for connection in self.connections:
+            while connection.poll(max(deadline - time.perf_counter(), 0)):
+                reply_id, result = connection.recv()
+                if reply_id == request_id:
+                    results.append(result)
+                    break
+        return results
+
+    def search(self, state, milli_sec):
+        return self.send("search", state, milli_sec)
+
+    def playouts(self, board, locs, player, playouts, timeout):
+        request_id = self.send("playouts", board, locs, player, playouts)
+        results = self.collect(request_id, timeout)
+        return len(results), sum(results)
+
+
 #class CustomPlayer(DataPlayer):
 class CustomPlayer_MCTS(DataPlayer):
     """ Implement your own agent to play knight's Isolation
@@ -177,12 +750,88 @@ class CustomPlayer_MCTS(DataPlayer):
     with default values, but the function MUST remain compatible with the
     default interface.
     """
-    max_moves = 90  # never seen plies go beyond mid 80
+    rollout_bias = 0.0  # share of playout moves chosen by mobility (see isolation.rollout.playout)
+    leaf_playouts = 1  # playouts per leaf; more than one runs them in a batch (needs numpy)
+    symmetry = True  # pool the statistics of mirrored positions
+    deadline_check = 8  # number of playouts between two checks of the clock
+    context_nodes = 5000  # most tree nodes carried to the next turn in self.context
+    parallel = None  # "root" or "leaf" to search with a pool of worker processes (see MCTSWorkerPool)
+    workers = max((os.cpu_count() or 1) - 1, 1)
+    search_time = 130  # milliseconds from the start of get_action to the end of the search
+    worker_margin = 10  # milliseconds of the budget left for the root parallel workers to reply
+    stats = NULL_INSTRUMENTS  # set by the harness to collect search statistics (see isolation.instrument)
+    # partitioned positions are solved exactly (see isolation.endgame): at the
+    # root with up to endgame_budget path search nodes, and at the tree nodes
+    # being expanded with up to endgame_search_budget
+    endgame_budget = 20000
+    endgame_search_budget = 500
 
-    def __init__(self, player_id):
+    def __init__(self, player_id, pool=True):
+        """ `pool` set to False searches in this process only, even if
+        `parallel` is set (as the workers of the pool do)
+        """
         super().__init__(player_id)
-        self.wins = {}
-        self.plays = {}
+        # every node of the search tree by the key of its position, so that
+        # transpositions (and mirror images) share their statistics
+        self.tree = {}
+        self.endgame = EndgameSolver(self.endgame_budget)
+        self.solved = {}  # winner of the solved tree nodes by key
+        self.iterations = 0  # playouts run by the last search
+        self.iterations_per_second = 0.0
+        self.depth = 0  # deepest tree ply reached by the last search
+        self.pool = None
+        if not pool:
+            self.parallel = None
+        elif self.parallel:
+            self.pool = MCTSWorkerPool(self.workers, {"symmetry": self.symmetry,
+                                                      "rollout_bias": self.rollout_bias,
+                                                      "leaf_playouts": self.leaf_playouts})
+
+    def new_board(self, state):
+        """ Return the board to play out `state` in place with push()/pop() """
+        if self.symmetry:
+            return SymmetricSearchBoard.from_state(state)
+        return SearchBoard.from_state(state)
+
+    def key(self, board):
+        """ Return the tree key of the position and the symmetry that maps the
+        board onto the frame the node actions are stored in
+
+        The key is the Zobrist hash, shared by the mirror images of the position
+        when `symmetry` is set.
+        """
+        if self.symmetry:
+            return board.canonical_zobrist()
+        return board.zobrist, 0
+
+    def node(self, board):
+        """ Return the tree node of the board position, and the symmetry of its frame """
+        key, sym = self.key(board)
+        node = self.tree.get(key)
+        if node is None:
+            node = self.tree[key] = MCTSNode(key)
+        return node, sym
+
+    def expand(self, node, board, sym):
+        """ Create the child nodes of the position on the board """
+        actions, children = [], []
+        for action in board.actions():
+            board.push(action)
+            children.append(self.node(board)[0])
+            board.pop()
+            actions.append(board.transform_action(action, sym))
+        node.actions, node.children = actions, children
+
+    def solve(self, node, board):
+        """ Return the winner of the node position if the players are
+        partitioned and the endgame solver settles it, otherwise None
+        """
+        winner = self.solved.get(node.key)
+        if winner is None:
+            winner = self.endgame.solve(board.board, board.locs, board.player(), self.endgame_search_budget)
+            if winner is not None:
+                self.solved[node.key] = winner
+        return winner
 
     def get_action(self, state):
         """ Employ an adversarial search technique to choose an action
@@ -194,86 +843,203 @@ class CustomPlayer_MCTS(DataPlayer):
 
         See RandomPlayer and GreedyPlayer in sample_players for more examples.
         """
+        begin = time.perf_counter()  # the search gets what is left of search_time from here
+        move = book_move(self.data, state)
+        if move is not None:
+            self.stats.count("book")
+            self.queue.put(move)
+            return
         if state.ply_count < 2:
             self.queue.put(random.choice(state.actions()))
-        else:
-            self.queue.put(self.monte_carlo_tree_search(state, milli_sec=130))
+            return
+        actions = state.actions()
+        if not actions:
+            return
+        # answer at once, since an endgame that is not solved within the budget takes a while
+        self.queue.put(actions[0])
+        # once the players are partitioned, follow the longest path of this player
+        solved = self.endgame.best_move(state.board, state.locs, state.player())
+        if solved is not None:
+            self.stats.count("endgame")
+            self.context = None
+            self.queue.put(solved[0])
+            return
+        self.load_context()
+        milli_sec = self.search_time - (time.perf_counter() - begin) * 1000
+        with self.stats.timer("search"):
+            action = self.monte_carlo_tree_search(state, milli_sec=milli_sec)
+        self.stats.count("playouts", self.iterations)
+        self.stats.observe("depth", self.depth)
+        self.save_context(state, action)
+        self.queue.put(action)
+
+    def load_context(self):
+        """ Rebuild the tree saved by save_context() on the previous turn """
+        if not self.context:
+            return
+        keys, plays, wins, counts, actions, children = self.context["tree"]
+        nodes = [MCTSNode(key) for key in keys]
+        first = 0
+        for node, node_plays, node_wins, count in zip(nodes, plays, wins, counts):
+            node.plays, node.wins = node_plays, node_wins
+            node.log_plays = math.log(node_plays) if node_plays else 0.0
+            if count >= 0:
+                node.actions = list(actions[first:first + count])
+                node.children = [nodes[i] for i in children[first:first + count]]
+                first += count
+        self.tree = {node.key: node for node in nodes}
+
+    def save_context(self, state, action):
+        """ Store the subtree under `action` in self.context, which contains
+        the position after the opponent's reply that starts the next turn
+
+        The nodes are flattened breadth first into typed arrays, which pickle
+        as plain bytes: the keys, play and win counts, the number of children
+        (-1 for a node that is not expanded), and the actions and child indices
+        of the expanded nodes. Once `context_nodes` nodes are stored the
+        remaining nodes are saved without their children.
+        """
+        board = self.new_board(state)
+        board.push(action)
+        root, _ = self.node(board)
+        index, order = {root: 0}, [root]
+        counts, actions, children = array("b"), array("h"), array("l")
+        for node in order:  # order grows while it is walked
+            if node.children is None or len(order) + len(node.children) > self.context_nodes:
+                counts.append(-1)
+                continue
+            counts.append(len(node.children))
+            actions.extend(node.actions)
+            for child in node.children:
+                if child not in index:
+                    index[child] = len(order)
+                    order.append(child)
+                children.append(index[child])
+        keys = array("Q", (node.key for node in order))
+        plays = array("l", (node.plays for node in order))
+        wins = array("d", (node.wins for node in order))
+        self.context = {"tree": (keys, plays, wins, counts, actions, children)}
 
-    def monte_carlo_tree_search(self, gameState, milli_sec):
+    def monte_carlo_tree_search(self, gameState, milli_sec, playouts=None):
         """ Causes the AI to calculate the best move from the
         current game state and return it. The combined algorithm is
         MCTS + UCB1 = UCT.
+
+        If `playouts` is given, exactly that many playouts are run whatever
+        the time they take (for reproducible benchmarks).
         """
 
-        def run_search(gameState):
-            """ Plays out a "random" game from the current position,
-            then updates the statistics tables with the result.
+        def run_search(board):
+            """ Plays out a "random" game from the position on the board,
+            then updates the statistics of the tree with the result and
+            takes the moves back. Only the tree moves are pushed on the
+            board; the playout below the tree runs on plain integers.
             """
-            plays, wins = self.plays, self.wins
-
-            visited_states = set()
-            copyState = copy.deepcopy(gameState)
-            player = copyState.player()
-
-            expand = True
-            for t in range(1, self.max_moves + 1):
-                action_states = [(action, copyState.result(action).board) for action in copyState.actions()]
-
-                if all(plays.get((player, s)) for a, s in action_states):
-                    # If we have stats on all of the legal moves here, use them.
-                    log_total = math.log(sum(plays[(player, s)] for a, s in action_states))
-                    value, move, state = max(
-                        ((wins[(player, s)] / plays[(player, s)]) +
-                         2 * math.sqrt(log_total / plays[(player, s)]), a, s)
-                        for a, s in action_states
-                    )
+            root_ply = board.ply_count
+            node, sym = self.node(board)
+            # the nodes of the tree visited, with the player who moved into each
+            path = [(node, 1 - board.player())]
+            winner = board.outcome()
+
+            # selection: descend by UCB1 until reaching a node that has not been
+            # played yet, or a partitioned position that the endgame solver settles
+            while winner is None and node.plays:
+                if node.children is None:
+                    winner = self.solve(node, board)
+                    if winner is not None:
+                        break
+                    self.expand(node, board, sym)
+                children = node.children
+                unplayed = [i for i, child in enumerate(children) if not child.plays]
+                if unplayed:
+                    i = random.choice(unplayed)
                 else:
-                    # just make an arbitrary decision.
-                    move, state = random.choice(action_states)
-
-                # `player` here and below refers to the player
-                # who moved into that particular state.
-                if expand and (player, state) not in plays:
-                    expand = False
-                    plays[(player, state)] = 0
-                    wins[(player, state)] = 0
-
-                visited_states.add((player, state))
-
-                copyState = copyState.result(move)
-                player = copyState.player()
-                winner = -1
-                if copyState.terminal_test():
-                    value = copyState.utility(player)
-                    if value > 0:
-                        winner = player
-                    elif value < 0:
-                        winner = 1 - player
-                    break
+                    log_plays = node.log_plays
+                    i = max(range(len(children)), key=lambda j: children[j].wins / children[j].plays +
+                            2 * math.sqrt(log_plays / children[j].plays))
+                player = board.player()
+                board.push(board.transform_action(node.actions[i], sym))
+                node, sym = children[i], self.key(board)[1]
+                path.append((node, player))
+                winner = board.outcome()
 
-            for player, state in visited_states:
-                if (player, state) not in plays:
-                    continue
-                plays[(player, state)] += 1
-                if player == winner:
-                    wins[(player, state)] += 1
+            # simulation: random moves to the end of the game, giving the
+            # number of playouts run and the number won by each player
+            playouts, wins = 1, [0, 0]
+            if winner is None and self.parallel == "leaf":
+                # only the replies that arrive before the end of the search count
+                active, timeout = board.player(), min(max(leaf_deadline - time.perf_counter(), 0), 1)
+                replies, wins[active] = self.pool.playouts(board.board, board.locs, active,
+                                                           self.leaf_playouts, timeout)
+                playouts = self.leaf_playouts * replies
+                wins[1 - active] = playouts - wins[active]
+            elif winner is None and self.leaf_playouts > 1:
+                playouts, active = self.leaf_playouts, board.player()
+                wins[active] = playouts * batch_playout(board.board, board.locs, active, playouts)
+                wins[1 - active] = playouts - wins[active]
+            else:
+                if winner is None:
+                    winner = playout(board.board, board.locs, board.player(), self.rollout_bias)
+                wins[winner] = 1
 
+            # backpropagation (none if no leaf parallel worker replied in time)
+            if playouts:
+                for node, player in path:
+                    node.plays += playouts
+                    node.log_plays = math.log(node.plays)
+                    node.wins += wins[player]
 
-        ### monte_carlo_tree_search ###
-        player = gameState.player()
+            depth = board.ply_count - root_ply
+            while board.ply_count > root_ply:
+                board.pop()
+            return depth
 
+
+        ### monte_carlo_tree_search ###
         # Bail out early if there is no real choice to be made.
         if len(gameState.actions()) == 1:
+            self.iterations = self.depth = 0
             return gameState.actions()[0]
 
-        calculation_time = datetime.timedelta(milliseconds=milli_sec)
-        begin = datetime.datetime.utcnow()
-        while datetime.datetime.utcnow() - begin < calculation_time:
-            run_search(gameState)
+        if self.parallel == "root":
+            request_id = self.pool.search(gameState, milli_sec - self.worker_margin)
 
-        action_states = [(action, gameState.result(action).board) for action in gameState.actions()]
-
-        percent_wins, move = max(
-            (self.wins.get((player, s), 0) / self.plays.get((player, s), 1), a) for a, s in action_states)
+        # one board for all the playouts, each of which rewinds it when done
+        board = self.new_board(gameState)
+        begin = time.perf_counter()
+        deadline = begin + milli_sec / 1000
+        # the leaf parallel workers may reply up to the deadline, or within a
+        # second when a fixed number of playouts is run
+        leaf_deadline = deadline if playouts is None else float("inf")
+        iterations = depth = 0
+        while True:
+            batch = self.deadline_check if playouts is None else min(self.deadline_check, playouts - iterations)
+            for _ in range(batch):
+                depth = max(depth, run_search(board))
+            iterations += batch
+            now = time.perf_counter()
+            if (now >= deadline) if playouts is None else (iterations >= playouts):
+                break
+        self.iterations, self.depth = iterations, depth
+        self.iterations_per_second = iterations / (now - begin)
+        logger.debug("%d playouts, %.0f playouts/s", iterations, self.iterations_per_second)
 
+        statistics = self.root_statistics(gameState)
+        if self.parallel == "root":
+            # the workers were given less time, so their replies should be waiting
+            for worker_statistics in self.pool.collect(request_id, self.worker_margin / 1000):
+                for action, (plays, wins) in worker_statistics.items():
+                    statistics[action][0] += plays
+                    statistics[action][1] += wins
+        percent_wins, move = max((wins / max(plays, 1), action)
+                                 for action, (plays, wins) in statistics.items())
         return move
+
+    def root_statistics(self, state):
+        """ Return {action: [plays, wins]} for the children of the state in the tree """
+        board = self.new_board(state)
+        root, sym = self.node(board)
+        if root.children is None:
+            self.expand(root, board, sym)
+        return {board.transform_action(action, sym): [child.plays, child.wins]
+                for action, child in zip(root.actions, root.children)}
@@ -0,0 +1,240 @@
+import argparse
+import json
+import logging
+import math
+import random
+import statistics
+import textwrap
+import time
+import tracemalloc
+
+from isolation import Isolation
+from sample_players import MinimaxPlayer
+from my_custom_player import CustomPlayer, CustomPlayer_MCTS, HEURISTICS
+
+logger = logging.getLogger(__name__)
+
+NUM_POSITIONS = 12  # benchmark positions: mid-game states from seeded random games
+POSITION_PLIES = (8, 16, 24)  # the positions are taken after these numbers of plies
+MAX_DEPTH = 5  # search depth of the minimax & alpha-beta engines
+PLAYOUTS = 2000  # playouts of the monte carlo engine
+REPEATS = 3  # timed runs of each search; the median time is reported
+ENGINES = ("minimax", "alphabeta", "pvs", "mcts")
+
+
+def make_positions(count=NUM_POSITIONS, seed=0):
+    """ Return `count` non-terminal positions from games of random moves
+
+    The games are played with random.Random(seed + i), so the positions are
+    the same in every run.
+    """
+    positions = []
+    game = 0
+    while len(positions) < count:
+        rng = random.Random(seed + game)
+        state = Isolation()
+        plies = POSITION_PLIES[game % len(POSITION_PLIES)]
+        while state.ply_count < plies and not state.terminal_test():
+            state = state.result(rng.choice(state.actions()))
+        if not state.terminal_test():
+            positions.append(state)
+        game += 1
+    return positions
+
+
+def count_results(search):
+    """ Return the number of states search() generates with Isolation.result() """
+    nodes = 0
+    result = Isolation.result
+
+    def counting_result(state, action):
+        nonlocal nodes
+        nodes += 1
+        return result(state, action)
+
+    Isolation.result = counting_result
+    try:
+        search()
+    finally:
+        Isolation.result = result
+    return nodes
+
+
+def timed(run, repeats):
+    """ Return the median time in seconds of `repeats` calls of run(), each
+    with the random module reseeded, and the value of the last call
+    """
+    times = []
+    for _ in range(repeats):
+        random.seed(0)
+        begin = time.perf_counter()
+        value = run()
+        times.append(time.perf_counter() - begin)
+    return statistics.median(times), value
+
+
+def peak_memory(run):
+    """ Return the peak memory (in bytes) allocated by run() """
+    random.seed(0)
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_depth_search(engine, state, max_depth, repeats):
+    """ Search `state` to every depth up to `max_depth`, as iterative deepening
+    does, and return the cumulative nodes and seconds at each depth
+    """
+    if engine == "minimax":
+        agent = MinimaxPlayer(state.player())
+        nodes = [count_results(lambda: agent.minimax(state, depth)) for depth in range(1, max_depth + 1)]
+        seconds = [timed(lambda: agent.minimax(state, depth), repeats)[0] for depth in range(1, max_depth + 1)]
+        return [sum(nodes[:i + 1]) for i in range(max_depth)], [sum(seconds[:i + 1]) for i in range(max_depth)]
+
+    def iterative_deepening():
+        agent = CustomPlayer(state.player())
+        agent.search_mode = engine
+        agent.tt.new_search()
+        nodes, seconds = [], []
+        begin = time.perf_counter()
+        for depth in range(1, max_depth + 1):
+            agent.search(state, depth)
+            nodes.append(agent.nodes)
+            seconds.append(time.perf_counter() - begin)
+        return nodes, seconds
+
+    runs = [iterative_deepening() for _ in range(repeats)]
+    return runs[0][0], [statistics.median(run[1][i] for run in runs) for i in range(max_depth)]
+
+
+def bench_mcts(state, playouts, repeats):
+    """ Return the tree nodes and the median seconds of `playouts` playouts from `state` """
+    def search():
+        agent = CustomPlayer_MCTS(state.player())
+        agent.monte_carlo_tree_search(state, milli_sec=0, playouts=playouts)
+        return len(agent.tree)
+    return timed(search, repeats)[::-1]
+
+
+def run_benchmark(engines, positions, max_depth, playouts, repeats):
+    """ Return {engine: report} with the totals of the engines over the positions """
+    reports = {}
+    for engine in engines:
+        if engine == "mcts":
+            results = [bench_mcts(state, playouts, repeats) for state in positions]
+            nodes = sum(n for n, _ in results)
+            seconds = sum(s for _, s in results)
+            reports[engine] = {
+                "nodes": nodes,
+                "seconds": seconds,
+                "nodes_per_second": nodes / seconds,
+                "playouts_per_second": playouts * len(positions) / seconds,
+            }
+        else:
+            results = [bench_depth_search(engine, state, max_depth, repeats) for state in positions]
+            nodes = sum(n[-1] for n, _ in results)
+            seconds = sum(s[-1] for _, s in results)
+            # effective branching factor: geometric mean of the growth of the tree with the last ply
+            ratios = [n[-1] / n[-2] for n, _ in results if max_depth > 1 and n[-2]]
+            reports[engine] = {
+                "nodes": nodes,
+                "seconds": seconds,
+                "nodes_per_second": nodes / seconds,
+                "time_to_depth": [sum(s[d] for _, s in results) for d in range(max_depth)],
+                "branching_factor": math.exp(statistics.mean(map(math.log, ratios))) if ratios else None,
+            }
+        if engine == "mcts":
+            run = lambda state: CustomPlayer_MCTS(state.player()).monte_carlo_tree_search(
+                state, milli_sec=0, playouts=playouts)
+        elif engine == "minimax":
+            run = lambda state: MinimaxPlayer(state.player()).minimax(state, max_depth)
+        else:
+            run = lambda state: bench_depth_search(engine, state, max_depth, 1)
+        reports[engine]["peak_memory"] = max(peak_memory(lambda: run(state)) for state in positions)
+        logger.info("%s: %s", engine, reports[engine])
+    return reports
+
+
+def print_report(reports, max_depth, playouts):
+    print("{:<10} {:>10} {:>10} {:>12} {:>8} {:>12}".format(
+        "engine", "nodes", "time (s)", "nodes/s", "EBF", "peak (KiB)"))
+    for engine, report in reports.items():
+        ebf = report.get("branching_factor")
+        print("{:<10} {:>10} {:>10.3f} {:>12.0f} {:>8} {:>12.1f}".format(
+            engine, report["nodes"], report["seconds"], report["nodes_per_second"],
+            "-" if ebf is None else "{:.2f}".format(ebf), report["peak_memory"] / 1024))
+    print()
+    for engine, report in reports.items():
+        if "time_to_depth" in report:
+            print("{:<10} time to depth 1..{} (s): {}".format(
+                engine, max_depth, " ".join("{:.3f}".format(s) for s in report["time_to_depth"])))
+        else:
+            print("{:<10} {} playouts per position, {:.0f} playouts/s".format(
+                engine, playouts, report["playouts_per_second"]))
+
+
+def main(args):
+    CustomPlayer.heuristic = args.heuristic
+    positions = make_positions(args.positions, args.seed)
+    reports = run_benchmark(args.engines, positions, args.depth, args.playouts, args.repeats)
+    print_report(reports, args.depth, args.playouts)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Benchmark the search engines on a fixed set of positions.",
+        epilog=textwrap.dedent("""\
+            The positions come from seeded random games, the depth searches run to a
+            fixed depth and the monte carlo search runs a fixed number of playouts, so
+            the node counts are identical from run to run and only the times vary.
+
+            Example Usage:
+            --------------
+            - Compare alpha-beta and PVS to depth 6 and save the results:
+
+                $python run_benchmark.py -e alphabeta pvs -d 6 --json bench.json
+        """)
+    )
+    parser.add_argument(
+        '-e', '--engines', nargs="+", default=list(ENGINES), choices=ENGINES,
+        help="Choose the engines to benchmark."
+    )
+    parser.add_argument(
+        '-n', '--positions', type=int, default=NUM_POSITIONS,
+        help="Set the number of benchmark positions."
+    )
+    parser.add_argument(
+        '-s', '--seed', type=int, default=0,
+        help="Set the seed of the first game used to generate the positions."
+    )
+    parser.add_argument(
+        '-d', '--depth', type=int, default=MAX_DEPTH,
+        help="Set the search depth of the minimax, alphabeta and pvs engines."
+    )
+    parser.add_argument(
+        '-p', '--playouts', type=int, default=PLAYOUTS,
+        help="Set the number of playouts of the mcts engine."
+    )
+    parser.add_argument(
+        '-r', '--repeats', type=int, default=REPEATS,
+        help="Set the number of timed runs of each search (the median time is reported)."
+    )
+    parser.add_argument(
+        '-H', '--heuristic', default=CustomPlayer.heuristic, choices=list(HEURISTICS),
+        help="Choose the leaf evaluation of the alphabeta and pvs engines."
+    )
+    parser.add_argument(
+        '--json', type=str, default=None,
+        help="Write the results to this file as JSON."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(filename="benchmark.log", filemode="w", level=logging.INFO)
+    main(args)
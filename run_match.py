@@ -9,15 +9,16 @@ import random
 import textwrap
 
 from collections import namedtuple
-from multiprocessing.pool import ThreadPool as Pool
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from isolation import Isolation, Agent, play
+from isolation import Isolation, Agent, Instruments, play
+from isolation.instrument import summarize
 from sample_players import RandomPlayer, GreedyPlayer, MinimaxPlayer
 from my_custom_player import CustomPlayer
 
 logger = logging.getLogger(__name__)
 
-NUM_PROCS = 1
+NUM_PROCS = os.cpu_count() or 1
 NUM_ROUNDS = 5  # number times to replicate the match; increase for higher confidence estimate
 TIME_LIMIT = 150  # number of milliseconds before timeout
 
@@ -28,23 +29,42 @@ TEST_AGENTS = {
     "SELF": Agent(CustomPlayer, "Custom TestAgent")
 }
 
-Match = namedtuple("Match", "players initial_state time_limit match_id debug_flag")
+Match = namedtuple("Match", "players initial_state time_limit match_id debug_flag persistent instrument",
+                   defaults=(False, False))
+
+
+def _make_pool(num_processes):
+    try:
+        return ProcessPoolExecutor(max_workers=num_processes, max_tasks_per_child=1)
+    except TypeError:  # max_tasks_per_child is only available from python 3.11
+        return ProcessPoolExecutor(max_workers=num_processes)
 
 
 def _run_matches(matches, name, num_processes=NUM_PROCS, debug=False):
+    """ Play the matches across a pool of worker processes and return the
+    results in the order the games finish
+
+    Every game runs in a fresh worker process (which forks the per-move agent
+    processes itself), so games do not share any state. In debug mode the
+    games are played one after another in this process.
+    """
     results = []
-    pool = Pool(1) if debug else Pool(num_processes)
     print("Running {} games:".format(len(matches)))
-    for result in pool.imap_unordered(play, matches):
-        print("+" if result[0].name == name else '-', end="")
-        results.append(result)
+    with _make_pool(num_processes) as pool:
+        if debug:
+            games = map(play, matches)
+        else:
+            games = (f.result() for f in as_completed([pool.submit(play, match) for match in matches]))
+        for result in games:
+            print("+" if result[0].name == name else '-', end="", flush=True)
+            results.append(result)
     print()
     return results
 
 
 def make_fair_matches(matches, results):
     new_matches = []
-    for _, game_history, match_id in results:
+    for _, game_history, match_id, *_ in results:
         if len(game_history) < 2:
             logger.warn(textwrap.dedent("""\
                 Unable to duplicate match {}
@@ -57,7 +77,9 @@ def make_fair_matches(matches, results):
                           initial_state=state,
                           time_limit=match.time_limit,
                           match_id=-match.match_id,
-                          debug_flag=match.debug_flag)
+                          debug_flag=match.debug_flag,
+                          persistent=match.persistent,
+                          instrument=match.instrument)
         new_matches.append(fair_match)
     return new_matches
 
@@ -74,6 +96,11 @@ def play_matches(custom_agent, test_agent, cli_args):
     player a victory. Playing "fair" matches this way will balance out the
     advantage of picking perfect openings (the player would win the first
     time, and then lose when their opponent uses that move against them).
+
+    Returns the number of games won by the custom agent, the number of games
+    played and, if the games are instrumented, the Instruments of the custom
+    agent merged over all the games (with the number of plies of every game in
+    the "plies" histogram), or else None.
     """
     matches = []
     for match_id in range(cli_args.rounds):
@@ -83,36 +110,74 @@ def play_matches(custom_agent, test_agent, cli_args):
             initial_state=state,
             time_limit=cli_args.time_limit,
             match_id=2 * match_id,
-            debug_flag=cli_args.debug))
+            debug_flag=cli_args.debug,
+            persistent=cli_args.persistent,
+            instrument=cli_args.instrument))
         matches.append(Match(
             players=(custom_agent, test_agent),
             initial_state=state,
             time_limit=cli_args.time_limit,
             match_id=2 * match_id + 1,
-            debug_flag=cli_args.debug))
+            debug_flag=cli_args.debug,
+            persistent=cli_args.persistent,
+            instrument=cli_args.instrument))
 
     # Run all matches -- must be done before fair matches in order to populate
     # the first move from each player; these moves are reused in the fair matches
-    results = _run_matches(matches, custom_agent.name, cli_args.processes)
+    results = _run_matches(matches, custom_agent.name, cli_args.processes, cli_args.debug)
+    runs = [(matches, results)]
 
     if cli_args.fair_matches:
         _matches = make_fair_matches(matches, results)
-        results.extend(_run_matches(_matches, custom_agent.name, cli_args.processes))
+        runs.append((_matches, _run_matches(_matches, custom_agent.name, cli_args.processes, cli_args.debug)))
 
-    wins = sum(int(r[0].name == custom_agent.name) for r in results)
-    return wins, len(matches) * (1 + int(cli_args.fair_matches))
+    stats = None
+    if cli_args.instrument:
+        stats = Instruments()
+        # the fair replay of match 0 also has id 0 (-0), so the ids are only
+        # unique among the matches of one run
+        for run_matches, run_results in runs:
+            players = {match.match_id: match.players for match in run_matches}
+            for _, game_history, match_id, game_stats in run_results:
+                stats.merge(game_stats[players[match_id].index(custom_agent)])
+                stats.observe("plies", len(game_history))
+
+    wins = sum(int(r[0].name == custom_agent.name) for _, run_results in runs for r in run_results)
+    return wins, len(matches) * (1 + int(cli_args.fair_matches)), stats
+
+
+def report_stats(stats):
+    """ Log and print the search statistics of the custom agent, per game and per move """
+    num_games = max(sum(stats.histograms["plies"].values()), 1)
+    moves = max(stats.counters["moves"], 1)
+    lines = ["moves: {:.1f} per game".format(moves / num_games)]
+    for name, count in sorted(stats.counters.items()):
+        if name != "moves":
+            lines.append("{}: {:.1f} per game, {:.1f} per move".format(name, count / num_games, count / moves))
+    for name, seconds in sorted(stats.timers.items()):
+        lines.append("{} time: {:.2f} s per game, {:.1f} ms per move".format(
+            name, seconds / num_games, 1000 * seconds / moves))
+    for name, histogram in sorted(stats.histograms.items()):
+        lines.append("{}: min: {}, mean: {:.2f}, median: {}, mode: {}, max: {}".format(
+            name, *summarize(histogram)))
+    for line in lines:
+        logger.info(line)
+        print(line)
+    print()
 
 
 def main(args):
     test_agent = TEST_AGENTS[args.opponent.upper()]
     custom_agent = Agent(CustomPlayer, "Custom Agent")
-    wins, num_games = play_matches(custom_agent, test_agent, args)
+    wins, num_games, stats = play_matches(custom_agent, test_agent, args)
 
     logger.info("Your agent won {:.1f}% of matches against {}".format(
        100. * wins / num_games, test_agent.name))
     print("Your agent won {:.1f}% of matches against {}".format(
        100. * wins / num_games, test_agent.name))
     print()
+    if stats is not None:
+        report_stats(stats)
 
 
 if __name__ == "__main__":
@@ -170,7 +235,8 @@ if __name__ == "__main__":
     parser.add_argument(
         '-p', '--processes', type=int, default=NUM_PROCS,
         help="""\
-            Set the number of parallel processes to use for running matches.  WARNING: 
+            Set the number of parallel processes to use for running matches (default: the
+            number of cores); each game runs in its own worker process.  WARNING: 
             Windows users may see inconsistent performance using >1 thread.  Check the 
             log file for time out errors and increase the time limit (add 50-100ms) if 
             your agent performs poorly.
@@ -180,6 +246,20 @@ if __name__ == "__main__":
         '-t', '--time_limit', type=int, default=TIME_LIMIT,
         help="Set the maximum allowed time (in milliseconds) for each call to agent.get_action()."
     )
+    parser.add_argument(
+        '--persistent', action="store_true",
+        help="""\
+            Run each agent in one worker process for the whole game instead of a new
+            process for every move, so that agents keep their search tables between turns.
+        """
+    )
+    parser.add_argument(
+        '-i', '--instrument', action="store_true",
+        help="""\
+            Collect the search statistics of your agent (e.g., nodes searched, search
+            time and depth reached on every move) and report them after the matches.
+        """
+    )
     args = parser.parse_args()
 
     logging.basicConfig(filename="matches.log", filemode="w", level=logging.DEBUG)
@@ -190,6 +270,8 @@ if __name__ == "__main__":
         "Fair Matches: {}\n".format(args.fair_matches) +
         "Time Limit: {}\n".format(args.time_limit) +
         "Processes: {}\n".format(args.processes) +
+        "Persistent Agents: {}\n".format(args.persistent) +
+        "Instrumented: {}\n".format(args.instrument) +
         "Debug Mode: {}".format(args.debug)
     )
 
@@ -53,9 +53,7 @@ class GreedyPlayer(BasePlayer):
     equivalent to a minimax search agent with a search depth of one.
     """
     def score(self, state):
-        own_loc = state.locs[self.player_id]
-        own_liberties = state.liberties(own_loc)
-        return len(own_liberties)
+        return state.mobility(self.player_id)
 
     def get_action(self, state):
         """Select the move from the available legal moves with the highest
@@ -128,8 +126,4 @@ class MinimaxPlayer(BasePlayer):
         return max(state.actions(), key=lambda x: min_value(state.result(x), depth - 1))
 
     def score(self, state):
-        own_loc = state.locs[self.player_id]
-        opp_loc = state.locs[1 - self.player_id]
-        own_liberties = state.liberties(own_loc)
-        opp_liberties = state.liberties(opp_loc)
-        return len(own_liberties) - len(opp_liberties)
+        return state.mobility(self.player_id) - state.mobility(1 - self.player_id)
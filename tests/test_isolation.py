@@ -0,0 +1,307 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from random import Random
+
+from isolation import Isolation, Instruments, SearchBoard, SymmetricSearchBoard
+from isolation.endgame import EndgameSolver, partition
+from isolation.instrument import NULL_INSTRUMENTS, summarize
+from isolation.isolation import _BLANK_BOARD, Action, _bit_indices
+from isolation.rollout import np, playout, batch_playout
+from isolation.table import MappedTable, write_table
+
+
+def _reference_liberties(state, loc):
+    """ Direct per-direction scan of the neighborhood of `loc` """
+    cells = range(state.board.bit_length()) if loc is None else (loc + a for a in Action)
+    return [c for c in cells if c >= 0 and state.board & (1 << c)]
+
+
+class BaseIsolationTest(unittest.TestCase):
+    def setUp(self):
+        rng = Random(0)
+        self.states = []
+        for _ in range(20):
+            state = Isolation()
+            self.states.append(state)
+            while not state.terminal_test():
+                state = state.result(rng.choice(state.actions()))
+                self.states.append(state)
+
+
+class MoveGenerationTest(BaseIsolationTest):
+    def test_liberties(self):
+        """ liberties() matches a direct scan of the knight neighborhood """
+        for state in self.states:
+            for loc in state.locs + (None,):
+                self.assertEqual(state.liberties(loc), _reference_liberties(state, loc))
+
+    def test_actions(self):
+        """ actions() returns Action values in enum order after the opening moves """
+        for state in self.states:
+            loc = state.locs[state.player()]
+            if loc is None: continue
+            expected = [a for a in Action if loc + a in _reference_liberties(state, loc)]
+            self.assertEqual(state.actions(), expected)
+            self.assertTrue(all(isinstance(a, Action) for a in state.actions()))
+
+    def test_mobility(self):
+        """ mobility() and liberty_mask() agree with the liberties() list """
+        for state in self.states:
+            for player_id in (0, 1):
+                liberties = state.liberties(state.locs[player_id])
+                self.assertEqual(state.mobility(player_id), len(liberties))
+                self.assertEqual(state.liberty_mask(state.locs[player_id]), sum(1 << c for c in liberties))
+
+    def test_outcome(self):
+        """ outcome() names the winner exactly when a player runs out of liberties """
+        for state in self.states:
+            active = state.player()
+            if not state.liberties(state.locs[active]):
+                expected = 1 - active
+            elif not state.liberties(state.locs[1 - active]):
+                expected = active
+            else:
+                expected = None
+            self.assertEqual(state.outcome(), expected)
+            self.assertEqual(state.terminal_test(), expected is not None)
+            if expected is not None:
+                self.assertEqual(state.utility(expected), float("inf"))
+                self.assertEqual(state.utility(1 - expected), float("-inf"))
+
+
+class SearchBoardTest(BaseIsolationTest):
+    def test_push_pop(self):
+        """ push() matches Isolation.result() and pop() restores the position """
+        for state in self.states:
+            board = SearchBoard.from_state(state)
+            self.assertEqual(board.actions(), state.actions())
+            self.assertEqual(board.outcome(), state.outcome())
+            for action in state.actions():
+                board.push(action)
+                self.assertEqual(board.to_state(), state.result(action))
+                self.assertEqual(board.zobrist, SearchBoard.from_state(state.result(action)).zobrist)
+                board.pop()
+                self.assertEqual(board.to_state(), state)
+                self.assertEqual(board.zobrist, SearchBoard.from_state(state).zobrist)
+
+
+class FloodFillTest(BaseIsolationTest):
+    def test_flood_fill(self):
+        """ flood_fill() layers the open cells by their knight distance from the location """
+        for state in self.states[::5]:
+            for loc in state.locs:
+                # breadth first search over the liberties
+                distances, frontier, distance = {}, [loc], 0
+                while frontier:
+                    distance += 1
+                    next_frontier = []
+                    for anchor in frontier:
+                        for cell in state.liberties(anchor):
+                            if cell not in distances:
+                                distances[cell] = distance
+                                next_frontier.append(cell)
+                    frontier = next_frontier
+                region, layers = state.flood_fill(loc)
+                self.assertEqual(region, sum(1 << cell for cell in distances))
+                self.assertEqual(len(layers), max(distances.values(), default=0))
+                for cell, distance in distances.items():
+                    self.assertTrue(layers[distance - 1] & (1 << cell))
+                self.assertEqual(SearchBoard.from_state(state).flood_fill(loc), (region, layers))
+
+
+class SymmetryTest(BaseIsolationTest):
+    def test_transform(self):
+        """ transform() commutes with result() through transform_action() """
+        for state in self.states:
+            for sym in range(4):
+                mirror = state.transform(sym)
+                self.assertEqual(mirror.transform(sym), state)
+                self.assertEqual(sorted(state.transform_action(a, sym) for a in state.actions()),
+                                 sorted(mirror.actions()))
+                for action in state.actions():
+                    self.assertEqual(state.result(action).transform(sym),
+                                     mirror.result(state.transform_action(action, sym)))
+
+    def test_canonical(self):
+        """ canonical() returns the same representative for all mirror images """
+        for state in self.states:
+            canonical, sym = state.canonical()
+            self.assertEqual(state.transform(sym), canonical)
+            for mirror in range(4):
+                self.assertEqual(state.transform(mirror).canonical()[0], canonical)
+
+    def test_symmetric_zobrist(self):
+        """ SymmetricSearchBoard tracks the hashes of the mirror images through push()/pop() """
+        def mirror_hashes(state):
+            return tuple(SearchBoard.from_state(state.transform(sym)).zobrist for sym in (1, 2, 3))
+
+        for state in self.states:
+            board = SymmetricSearchBoard.from_state(state)
+            self.assertEqual(board.symmetric_zobrist, mirror_hashes(state))
+            for action in state.actions():
+                board.push(action)
+                self.assertEqual(board.symmetric_zobrist, mirror_hashes(state.result(action)))
+                board.pop()
+            self.assertEqual(board.symmetric_zobrist, mirror_hashes(state))
+            key, sym = board.canonical_zobrist()
+            self.assertEqual(key, SearchBoard.from_state(state.transform(sym)).zobrist)
+
+
+class RolloutTest(BaseIsolationTest):
+    def test_playout(self):
+        """ playout() plays the same game as Isolation.result() with the same random choices """
+        for seed, state in enumerate(self.states):
+            rng = Random(seed)
+            while not state.terminal_test():
+                state = state.result(rng.choice(state.actions()))
+            winner = playout(self.states[seed].board, self.states[seed].locs, self.states[seed].player(),
+                             rng=Random(seed))
+            self.assertEqual(winner, state.outcome())
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_batch_playout(self):
+        """ batch_playout() wins as often as playout() """
+        state = self.states[10]
+        playouts = 4000
+        fraction = sum(playout(state.board, state.locs, state.player()) == state.player()
+                       for _ in range(playouts)) / playouts
+        batch_fraction = batch_playout(state.board, state.locs, state.player(), playouts,
+                                       np.random.default_rng(0))
+        self.assertAlmostEqual(fraction, batch_fraction, delta=0.05)
+
+
+def _reference_winner(state):
+    """ Winner of the state under perfect play by exhaustive game tree search """
+    winner = state.outcome()
+    if winner is not None:
+        return winner
+    player = state.player()
+    if any(_reference_winner(state.result(action)) == player for action in state.actions()):
+        return player
+    return 1 - player
+
+
+class EndgameTest(BaseIsolationTest):
+    def test_partition(self):
+        """ partition() returns the reachable regions exactly when they are disjoint """
+        for state in self.states:
+            if None in state.locs:
+                self.assertIsNone(partition(state.board, state.locs))
+                continue
+            regions = tuple(state.flood_fill(loc)[0] for loc in state.locs)
+            if regions[0] & regions[1]:
+                self.assertIsNone(partition(state.board, state.locs))
+            else:
+                self.assertEqual(partition(state.board, state.locs), regions)
+
+    def test_solve(self):
+        """ EndgameSolver.solve() finds the winner of perfect play in partitioned positions """
+        # late game positions: a few open cells left at random
+        rng = Random(1)
+        cells = _bit_indices(_BLANK_BOARD)
+        solver = EndgameSolver()
+        solved = 0
+        for _ in range(300):
+            sample = rng.sample(cells, 26)
+            state = Isolation(sum(1 << cell for cell in sample[2:]), rng.randrange(2, 4), tuple(sample[:2]))
+            if partition(state.board, state.locs) is None:
+                continue
+            winner = solver.solve(state.board, state.locs, state.player())
+            self.assertEqual(winner, _reference_winner(state))
+            if state.terminal_test():
+                continue
+            best_move = solver.best_move(state.board, state.locs, state.player())
+            self.assertEqual(best_move[1], winner)
+            self.assertIn(best_move[0], state.actions())
+            if winner == state.player():
+                self.assertEqual(_reference_winner(state.result(best_move[0])), winner)
+            solved += 1
+        self.assertGreater(solved, 50)
+
+    def test_budget(self):
+        """ EndgameSolver leaves the position unsolved when the budget runs out """
+        state = next(state for state in self.states if partition(state.board, state.locs) and
+                     (EndgameSolver().longest_path(state.board, state.locs[0]) or 0) > 3)
+        solver = EndgameSolver(budget=2)
+        self.assertIsNone(solver.solve(state.board, state.locs, state.player()))
+        # a region as large as one the budget ran out on is given up without a search
+        self.assertIsNone(solver.solve(state.board, state.locs, state.player()))
+        self.assertEqual(solver.nodes, 0)
+        self.assertIsNotNone(solver.longest_path(state.board, state.locs[0], budget=20000))
+
+
+class InstrumentsTest(unittest.TestCase):
+    def test_merge(self):
+        """ Instruments.merge() adds up counters, timers and histograms """
+        first, second = Instruments(), Instruments()
+        first.count("nodes", 10)
+        first.observe("depth", 3)
+        with first.timer("search"):
+            pass
+        second.count("nodes", 5)
+        second.add_time("search", 1.0)
+        second.observe("depth", 3)
+        second.observe("depth", 5)
+        first.merge(second)
+        self.assertEqual(first.counters["nodes"], 15)
+        self.assertGreaterEqual(first.timers["search"], 1.0)
+        self.assertEqual(summarize(first.histograms["depth"]), (3, 11 / 3, 3, 3, 5))
+
+    def test_null(self):
+        """ NULL_INSTRUMENTS accepts every call and records nothing """
+        NULL_INSTRUMENTS.count("nodes")
+        NULL_INSTRUMENTS.add_time("search", 1.0)
+        NULL_INSTRUMENTS.observe("depth", 3)
+        with NULL_INSTRUMENTS.timer("search"):
+            pass
+        self.assertFalse(NULL_INSTRUMENTS.enabled)
+
+
+class MappedTableTest(unittest.TestCase):
+    def test_lookup(self):
+        """ MappedTable finds every key written with write_table() and no other """
+        rng = Random(0)
+        items = {rng.getrandbits(64): rng.randrange(-2 ** 31, 2 ** 31) for _ in range(1000)}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.bin")
+            write_table(path, items)
+            table = MappedTable(path)
+            self.assertEqual(len(table), len(items))
+            for key, value in items.items():
+                self.assertEqual(table[key], value)
+            for key in (0, 2 ** 64 - 1, rng.getrandbits(64)):
+                self.assertEqual(key in table, key in items)
+            self.assertIsNone(table.get(min(items) - 1))
+            # a table pickles as its path
+            copy = pickle.loads(pickle.dumps(table))
+            self.assertLess(len(pickle.dumps(table)), 100)
+            self.assertEqual(copy.get(max(items)), items[max(items)])
+            table.close()
+            copy.close()
+
+    def test_invalid(self):
+        """ A table file is replaced without touching the mapped table, and a
+        file that is not a complete table unpickles as no table
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.bin")
+            write_table(path, {1: 10, 2: 20})
+            table = MappedTable(path)
+            write_table(path, {3: 30})
+            self.assertEqual((table.get(1), table.get(3)), (10, None))
+            table.close()
+            table = MappedTable(path)
+            pickled, data = pickle.dumps(table), table._map[:]
+            table.close()
+            self.assertEqual(os.listdir(directory), ["table.bin"])
+            for data in (b"", data[:8], data[:-1]):
+                with open(path, "wb") as f:
+                    f.write(data)
+                with self.assertRaises(ValueError):
+                    MappedTable(path)
+                self.assertIsNone(pickle.loads(pickled))
+            os.remove(path)
+            self.assertIsNone(pickle.loads(pickled))
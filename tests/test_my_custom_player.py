@@ -1,13 +1,41 @@
 
+import os
+import pickle
+import tempfile
 import unittest
 
 from collections import deque
-from random import choice
+from queue import Empty
+from random import Random, choice
 from textwrap import dedent
+from types import SimpleNamespace
+from unittest.mock import patch
 
-from isolation import Isolation, Agent, fork_get_action, play, DebugState
+from isolation import Isolation, Agent, fork_get_action, play, _play, DebugState, SearchBoard, SymmetricSearchBoard
+from isolation.endgame import EndgameSolver, partition
+from isolation.table import MappedTable, write_table
 from sample_players import RandomPlayer
-from my_custom_player import CustomPlayer
+from my_custom_player import CustomPlayer, CustomPlayer_MCTS, TranspositionTable, HEURISTICS, book_move, voronoi
+from build_opening_book import book_key, build_book
+from run_match import play_matches
+
+# The agents load the opening book from data.pickle in the working directory if
+# there is one (see build_opening_book.py), in every process that creates them.
+# The tests run in an empty directory, so the agents have no book unless a test
+# sets agent.data.
+_directories = []
+
+
+def setUpModule():
+    directory = tempfile.TemporaryDirectory()
+    _directories.extend((os.getcwd(), directory))
+    os.chdir(directory.name)
+
+
+def tearDownModule():
+    working_directory, directory = _directories
+    os.chdir(working_directory)
+    directory.cleanup()
 
 
 class BaseCustomPlayerTest(unittest.TestCase):
@@ -47,7 +75,148 @@ class CustomPlayerGetActionTest(BaseCustomPlayerTest):
 
     def test_get_action_terminal(self):
         """ get_action() calls self.queue.put() before timeout when the game is over """
-        self._test_state(self.terminal_state)
+        if self.terminal_state.actions():
+            self._test_state(self.terminal_state)
+        else:  # there is no action to put, which the queue reports instead of blocking
+            agent = CustomPlayer(self.terminal_state.ply_count % 2)
+            with self.assertRaises(Empty):
+                fork_get_action(self.terminal_state, agent, self.time_limit)
+
+    def test_get_action_endgame(self):
+        """ get_action() calls self.queue.put() before timeout when the endgame solve takes too long """
+        rng = Random(0)
+        state = None
+        while state is None:  # a partitioned position that the solver does not settle
+            game = Isolation()
+            while not game.terminal_test() and (game.ply_count < 2 or partition(game.board, game.locs) is None):
+                game = game.result(rng.choice(game.actions()))
+            if len(game.actions()) > 1 and EndgameSolver().solve(game.board, game.locs, game.player()) is None:
+                state = game
+        for agent_class in (CustomPlayer, CustomPlayer_MCTS):
+            agent = agent_class(state.player())
+            agent.endgame = EndgameSolver(budget=100000)  # longer than the time limit
+            self.assertIn(fork_get_action(state, agent, self.time_limit), state.actions())
+
+
+class CustomPlayerSearchTest(BaseCustomPlayerTest):
+    def test_pvs_matches_alpha_beta(self):
+        """ pvs_search() finds the same root value as alpha_beta_search() """
+        state = self.move_2_state
+        while not state.terminal_test():
+            values = []
+            for search_mode in ("alphabeta", "pvs"):
+                agent = CustomPlayer(state.player())
+                agent.search_mode = search_mode
+                action = agent.search(state, 3)
+                self.assertIn(action, state.actions())
+                values.append(agent.tt.lookup(SearchBoard.from_state(state))[3])
+            self.assertAlmostEqual(values[0], values[1])
+            state = state.result(choice(state.actions()))
+
+    def test_load_context(self):
+        """ load_context() predicts the PV move without touching the transposition table """
+        state = self.move_0_state.result(57).result(40)
+        agent = CustomPlayer(state.player())
+        for depth in range(1, 5):
+            agent.search(state, depth)
+        agent.save_context(state, 4)
+        entries = list(agent.tt.entries)
+        self.assertEqual(agent.load_context(state), agent.context["pv"][0])
+        self.assertEqual(agent.tt.entries, entries)
+        reply = SearchBoard.from_state(state.result(agent.context["pv"][0]))
+        self.assertEqual(agent.ordering.order(reply)[0], agent.context["pv"][1])
+
+
+def _knight_distances(state, loc):
+    """ Knight distance from `loc` to every open cell it can reach """
+    distances, frontier = {}, [loc]
+    while frontier:
+        next_frontier = []
+        for anchor in frontier:
+            for cell in state.liberties(anchor):
+                if cell not in distances:
+                    distances[cell] = distances.get(anchor, 0) + 1
+                    next_frontier.append(cell)
+        frontier = next_frontier
+    return distances
+
+
+class HeuristicsTest(BaseCustomPlayerTest):
+    def test_voronoi(self):
+        """ voronoi() counts the cells each player reaches first """
+        state = self.move_2_state
+        while not state.terminal_test():
+            own, opp = (_knight_distances(state, loc) for loc in state.locs)
+            territory = sum(own[c] < opp.get(c, float("inf")) for c in own) - \
+                sum(opp[c] < own.get(c, float("inf")) for c in opp)
+            self.assertEqual(voronoi(state, 0), territory)
+            self.assertEqual(voronoi(SearchBoard.from_state(state), 1), -territory)
+            state = state.result(choice(state.actions()))
+
+    def test_heuristics(self):
+        """ Every heuristic of HEURISTICS can drive the search """
+        for heuristic in HEURISTICS:
+            agent = CustomPlayer(self.move_2_state.player())
+            agent.heuristic = heuristic
+            self.assertIn(agent.search(self.move_2_state, 3), self.move_2_state.actions())
+
+
+class CustomPlayerMCTSTest(BaseCustomPlayerTest):
+    def test_monte_carlo_tree_search(self):
+        """ monte_carlo_tree_search() returns a legal action with or without symmetry """
+        state = self.move_0_state.result(57).result(40)
+        for symmetry in (False, True):
+            agent = CustomPlayer_MCTS(state.player())
+            agent.symmetry = symmetry
+            action = agent.monte_carlo_tree_search(state, milli_sec=50)
+            self.assertIn(action, state.actions())
+            root, _ = agent.node(agent.new_board(state))
+            self.assertGreater(root.plays, 0)
+            self.assertLessEqual(sum(child.plays for child in set(root.children)), root.plays)
+
+    def test_fixed_playouts(self):
+        """ monte_carlo_tree_search() runs exactly the requested number of playouts """
+        state = self.move_0_state.result(57).result(40)
+        agent = CustomPlayer_MCTS(state.player())
+        agent.monte_carlo_tree_search(state, milli_sec=0, playouts=37)
+        self.assertEqual(agent.iterations, 37)
+        self.assertEqual(agent.node(agent.new_board(state))[0].plays, 37)
+
+    def test_parallel(self):
+        """ monte_carlo_tree_search() returns a legal action with root and leaf parallel workers """
+        state = self.move_0_state.result(57).result(40)
+        for parallel in ("root", "leaf"):
+            # set on the class itself, which the workers inherit when they are forked
+            with patch.multiple(CustomPlayer_MCTS, parallel=parallel, workers=2):
+                agent = CustomPlayer_MCTS(state.player())
+                action = agent.monte_carlo_tree_search(state, milli_sec=50)
+                self.assertIn(action, state.actions())
+                if parallel == "leaf":  # every worker replies to every leaf of a fixed number of playouts
+                    agent.tree = {}
+                    agent.monte_carlo_tree_search(state, milli_sec=0, playouts=10)
+                    self.assertEqual(agent.node(agent.new_board(state))[0].plays, 10 * 2)
+            processes = agent.pool.processes
+            del agent
+            for process in processes:
+                process.join(timeout=5)
+                self.assertFalse(process.is_alive())
+
+    def test_context(self):
+        """ The subtree saved in self.context is rebuilt on the next turn """
+        state = self.move_0_state.result(57).result(40)
+        agent = CustomPlayer_MCTS(state.player())
+        action = agent.monte_carlo_tree_search(state, milli_sec=50)
+        agent.save_context(state, action)
+        resumed = CustomPlayer_MCTS(state.player())
+        resumed.context = pickle.loads(pickle.dumps(agent.context))
+        resumed.load_context()
+        state = state.result(action)
+        for reply in [None] + state.actions():
+            next_state = state if reply is None else state.result(reply)
+            node, _ = agent.node(agent.new_board(next_state))
+            resumed_node, _ = resumed.node(resumed.new_board(next_state))
+            self.assertEqual((resumed_node.plays, resumed_node.wins), (node.plays, node.wins))
+            self.assertEqual(resumed_node.actions, node.actions)
 
 
 class CustomPlayerPlayTest(BaseCustomPlayerTest):
@@ -71,3 +240,105 @@ class CustomPlayerPlayTest(BaseCustomPlayerTest):
                        
             raise Exception("Your agent did not play until a terminal state.")
 
+    def test_custom_player_persistent(self):
+        """ CustomPlayer completes a game against itself in persistent worker processes """
+        agents = (Agent(CustomPlayer, "Player 1"),
+                  Agent(CustomPlayer, "Player 2"))
+        initial_state = Isolation()
+        winner, game_history, _ = _play(agents, initial_state, self.time_limit, 0, persistent=True)
+        state = initial_state
+        for action in game_history:
+            state = state.result(action)
+        self.assertTrue(state.terminal_test())
+
+    def test_custom_player_instrumented(self):
+        """ An instrumented game returns the search statistics of both agents """
+        agents = (Agent(CustomPlayer, "Player 1"),
+                  Agent(CustomPlayer_MCTS, "Player 2"))
+        for persistent in (False, True):
+            _, game_history, _, stats = _play(agents, Isolation(), self.time_limit, 0,
+                                              persistent=persistent, instrument=True)
+            for player_id, player_stats in enumerate(stats):
+                moves = len(game_history[player_id::2])
+                self.assertEqual(player_stats.counters["moves"], moves)
+                searched = sum(player_stats.histograms["depth"].values())
+                self.assertEqual(searched + player_stats.counters["book"] + player_stats.counters["endgame"],
+                                 moves - 1)
+                self.assertGreater(player_stats.timers["search"], 0)
+            self.assertGreater(stats[0].counters["nodes"], 0)
+            self.assertGreater(stats[1].counters["playouts"], 0)
+
+    def test_fair_matches_instrumented(self):
+        """ play_matches() merges the statistics of the custom agent only, fair replays included """
+        custom_agent, test_agent = Agent(CustomPlayer, "Custom Agent"), Agent(RandomPlayer, "Random Agent")
+        args = SimpleNamespace(rounds=1, time_limit=self.time_limit, debug=False, persistent=False,
+                               instrument=True, fair_matches=True, processes=2)
+        _, num_games, stats = play_matches(custom_agent, test_agent, args)
+        self.assertEqual(sum(stats.histograms["plies"].values()), num_games)
+        # every move of the custom agent is a placement (one in each of the two
+        # games from the empty board), a book or endgame move, or a search
+        searched = sum(stats.histograms["depth"].values())
+        self.assertEqual(2 + stats.counters["book"] + stats.counters["endgame"] + searched,
+                         stats.counters["moves"])
+
+
+
+class TranspositionTableTest(unittest.TestCase):
+    def test_replacement(self):
+        """ TranspositionTable keeps the deeper entry until a new search starts """
+        tt = TranspositionTable(size_bits=4)
+        first, second = SimpleNamespace(zobrist=0x10), SimpleNamespace(zobrist=0x20)
+        tt.store(first, 5, TranspositionTable.EXACT, 1.0, 25)
+        tt.store(second, 3, TranspositionTable.LOWER, 2.0, 11)  # same slot, shallower
+        self.assertIsNone(tt.lookup(second))
+        self.assertEqual(tt.lookup(first)[1:5], (5, TranspositionTable.EXACT, 1.0, 25))
+        tt.new_search()
+        tt.store(second, 3, TranspositionTable.LOWER, 2.0, 11)
+        self.assertIsNone(tt.lookup(first))
+        self.assertEqual(tt.lookup(second)[1:5], (3, TranspositionTable.LOWER, 2.0, 11))
+
+    def test_symmetric(self):
+        """ A symmetric TranspositionTable shares entries between mirrored positions """
+        tt = TranspositionTable(symmetric=True)
+        state = Isolation().result(57).result(40)
+        tt.store(SymmetricSearchBoard.from_state(state), 3, TranspositionTable.EXACT, 1.0, state.actions()[0])
+        for sym in range(4):
+            mirror = SymmetricSearchBoard.from_state(state.transform(sym))
+            entry = tt.lookup(mirror)
+            self.assertEqual(entry[3], 1.0)
+            self.assertEqual(entry[4], state.transform_action(state.actions()[0], sym))
+
+
+class OpeningBookTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.book = build_book(plies=2, depth=2, num_processes=1)
+
+    def test_book_moves(self):
+        """ The book has a legal move for every position of its plies, the same for mirror images """
+        state = Isolation()
+        self.assertIn(book_move(self.book, state), state.actions())
+        for first_move in state.actions():
+            child = state.result(first_move)
+            move = book_move(self.book, child)
+            self.assertIn(move, child.actions())
+            for sym in range(4):
+                # the same move up to the symmetries of the position itself
+                mirror = child.transform(sym)
+                mirror_move = book_move(self.book, mirror)
+                self.assertEqual(book_key(mirror.result(mirror_move))[0], book_key(child.result(move))[0])
+            self.assertIsNone(book_move(self.book, child.result(move)))
+
+    def test_agents_play_book_moves(self):
+        """ The agents play the move of the book in self.data, as a dict or a MappedTable """
+        state = Isolation().result(57)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.bin")
+            write_table(path, self.book)
+            table = MappedTable(path)
+            for book in (self.book, table):
+                for agent_class in (CustomPlayer, CustomPlayer_MCTS):
+                    agent = agent_class(state.player())
+                    agent.data = book
+                    self.assertEqual(fork_get_action(state, agent, 150), book_move(self.book, state))
+            table.close()